@@ -0,0 +1,29 @@
+import hmac
+
+from fastapi import Header, HTTPException, Query
+
+from app.core.config import settings
+from app.core.db import DEFAULT_TENANT
+from app.repositories.shards import valid_tenant
+
+
+def tenant_id(
+    x_focusflight_tenant: str | None = Header(None),
+    tenant: str | None = Query(None, max_length=64),
+) -> str:
+    """Tenant of the request: X-FocusFlight-Tenant header, else ?tenant=, else the default tenant."""
+    t = (x_focusflight_tenant or tenant or DEFAULT_TENANT).strip()
+    if not valid_tenant(t):
+        raise HTTPException(status_code=400, detail="invalid tenant")
+    return t
+
+
+def require_admin(x_focusflight_admin: str | None = Header(None)) -> None:
+    """Admin endpoints: X-FocusFlight-Admin must carry FOCUSFLIGHT_ADMIN_TOKEN; without a token they do not exist."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # байты, а не str: compare_digest падает с TypeError на не-ASCII строках
+    if not x_focusflight_admin or not hmac.compare_digest(
+        x_focusflight_admin.encode(), settings.admin_token.encode()
+    ):
+        raise HTTPException(status_code=403, detail="forbidden")
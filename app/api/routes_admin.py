@@ -0,0 +1,28 @@
+import threading
+
+from fastapi import APIRouter, Body, Depends
+from fastapi.responses import JSONResponse
+
+from app.api.deps import require_admin
+from app.services.archive import run_archive
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+_archive_lock = threading.Lock()
+
+@router.post("/archive")
+def archive(payload: dict = Body(default={})):
+    try:
+        days = payload.get("older_than_days")
+        days = None if days is None else max(0, int(days))
+        vacuum = bool(payload.get("vacuum", True))
+    except (TypeError, ValueError):
+        return JSONResponse({"error": "bad request"}, status_code=400)
+
+    # один прогон на процесс; между воркерами пересечения безопасны (INSERT OR IGNORE, батчи)
+    if not _archive_lock.acquire(blocking=False):
+        return JSONResponse({"error": "archive already running"}, status_code=409)
+    try:
+        return {"shards": run_archive(days, vacuum)}
+    finally:
+        _archive_lock.release()
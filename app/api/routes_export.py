@@ -1,16 +1,27 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from fastapi.responses import Response
+from app.api.deps import tenant_id
 from app.repositories.sessions_repo import SessionsRepo
-from app.services.export_csv import export_sessions_csv
+from app.services.export_csv import export_distractions_csv, export_sessions_csv
 
 router = APIRouter(prefix="/api", tags=["export"])
 repo = SessionsRepo()
 
 @router.get("/export/sessions.csv")
-def export_csv():
-    csv_text = export_sessions_csv(repo)
+def export_csv(tenant: str = Depends(tenant_id)):
+    # only this tenant's shard is read
+    csv_text = export_sessions_csv(repo.for_tenant(tenant))
     return Response(
         content=csv_text,
         media_type="text/csv; charset=utf-8",
         headers={"Content-Disposition": 'attachment; filename="focusflight_sessions.csv"'}
     )
+
+@router.get("/export/distractions.csv")
+def export_distractions(tenant: str = Depends(tenant_id)):
+    csv_text = export_distractions_csv(repo.for_tenant(tenant))
+    return Response(
+        content=csv_text,
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="focusflight_distractions.csv"'}
+    )
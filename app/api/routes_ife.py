@@ -1,53 +1,19 @@
 from fastapi import APIRouter, Query, Depends
 import sqlite3
-import math
-from timezonefinder import TimezoneFinder
 
 from app.core.airports import AIRPORTS
+from app.core.geo import estimate_duration_minutes, haversine_km, lerp
 from app.db.db import get_db  # твоя функция подключения sqlite
+from app.services import ife_compute
+from app.services.ife_compute import airport_code_col, airports_key
+from app.services.itinerary import Airport, cached_search, get_graph
 
-_tf = TimezoneFinder()
 router = APIRouter(prefix="/api/ife", tags=["ife"])
 
 
-def haversine_km(lat1, lon1, lat2, lon2) -> float:
-    r = 6371.0
-    p1 = math.radians(lat1)
-    p2 = math.radians(lat2)
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = (math.sin(dlat / 2) ** 2) + math.cos(p1) * math.cos(p2) * (math.sin(dlon / 2) ** 2)
-    return 2 * r * math.asin(math.sqrt(a))
-
-
-def lerp(a: float, b: float, t: float) -> float:
-    return a + (b - a) * t
-
-
-def estimate_duration_minutes(distance_km: float) -> int:
-    cruise_kmh = 820.0
-    overhead_min = 22.0
-    mins = (distance_km / cruise_kmh) * 60.0 + overhead_min
-    return max(5, int(round(mins)))
-
-
-def _airport_code_col(conn: sqlite3.Connection) -> str | None:
-    cols = {r["name"] for r in conn.execute("PRAGMA table_info(airports)").fetchall()}
-    # твоя схема: iata
-    if "iata" in cols:
-        return "iata"
-    # схема ourairports: iata_code
-    if "iata_code" in cols:
-        return "iata_code"
-    # схема ourairports: code (если iata отсутствует)
-    if "code" in cols:
-        return "code"
-    return None
-
-
 def _db_get_airport(conn: sqlite3.Connection, code: str) -> dict | None:
     c = code.upper().strip()
-    code_col = _airport_code_col(conn)
+    code_col = airport_code_col(conn)
     if not code_col:
         return None
 
@@ -97,8 +63,7 @@ def get_airport(code: str, conn: sqlite3.Connection | None = None) -> dict | Non
 
 @router.get("/tz")
 def tz(lat: float, lon: float):
-    name = _tf.timezone_at(lat=lat, lng=lon) or "UTC"
-    return {"tz": name}
+    return {"tz": ife_compute.run(ife_compute.timezone_at, lat, lon)}
 
 
 # удобный поиск (можно дергать из фронта)
@@ -115,31 +80,7 @@ def airports_search(
     q_up = query.upper()
     q_lo = query.lower()
 
-    code_col = _airport_code_col(db)
-
-    def score_item(code: str, name: str) -> int:
-        code_u = (code or "").upper()
-        name_s = (name or "")
-        name_l = name_s.lower()
-
-        s = 0
-        if code_u == q_up:
-            s += 1000
-        elif code_u.startswith(q_up):
-            s += 700
-        elif q_up in code_u:
-            s += 350
-
-        if name_l.startswith(q_lo):
-            s += 320
-        elif q_lo in name_l:
-            s += 160
-
-        parts = [p for p in q_lo.split() if p]
-        if parts and all(p in name_l for p in parts):
-            s += 140
-
-        return s
+    code_col = airport_code_col(db)
 
     items = []
 
@@ -176,8 +117,7 @@ def airports_search(
             if len(items) >= 220:
                 break
 
-    items.sort(key=lambda a: (-score_item(a["code"], a["name"]), a["code"]))
-    return {"items": items[:limit]}
+    return {"items": ife_compute.run(ife_compute.rank_airports, items, query, limit)}
 
 @router.get("/pick")
 def pick(
@@ -189,41 +129,57 @@ def pick(
     if not o:
         return {"error": "bad origin"}
 
-    candidates: list[tuple[float, str, float, int]] = []
+    best_code = ife_compute.run(ife_compute.best_destination, o["code"], o["lat"], o["lon"], minutes)
+    if not best_code:
+        return {"error": "no destination"}
+    return plan(origin=o["code"], dest=best_code, planned_minutes=minutes, db=db)
+
 
-    code_col = _airport_code_col(db)
+def _load_airports(conn: sqlite3.Connection) -> list[Airport]:
+    items: dict[str, Airport] = {}
+    code_col = airport_code_col(conn)
     if code_col:
-        rows = db.execute(
+        for r in conn.execute(
             f"""
             SELECT {code_col} AS code, name, lat, lon
             FROM airports
             WHERE {code_col} IS NOT NULL AND TRIM({code_col}) != ''
-            LIMIT 4000
             """
-        ).fetchall()
-
-        for r in rows:
+        ):
             code = (r["code"] or "").upper().strip()
-            if not code or code == o["code"]:
-                continue
-            lat = float(r["lat"])
-            lon = float(r["lon"])
-            km = haversine_km(o["lat"], o["lon"], lat, lon)
-            est_min = estimate_duration_minutes(km)
-            candidates.append((abs(est_min - minutes), code, km, est_min))
-
-    # если база пустая или не подошла, fallback на AIRPORTS
-    if not candidates:
-        for code, d in AIRPORTS.items():
-            if code == o["code"]:
-                continue
-            km = haversine_km(o["lat"], o["lon"], d["lat"], d["lon"])
-            est_min = estimate_duration_minutes(km)
-            candidates.append((abs(est_min - minutes), code, km, est_min))
+            if code and code not in items:
+                items[code] = Airport(code, r["name"], float(r["lat"]), float(r["lon"]))
+    # встроенный список всегда в графе: get_airport() его тоже знает
+    for code, a in AIRPORTS.items():
+        items.setdefault(code, Airport(code, a["name"], a["lat"], a["lon"]))
+    return list(items.values())
 
-    candidates.sort(key=lambda x: x[0])
-    best_code = candidates[0][1]
-    return plan(origin=o["code"], dest=best_code, planned_minutes=minutes, db=db)
+
+@router.get("/itinerary")
+def itinerary(
+    origin: str = Query("BER"),
+    minutes: int = Query(180, ge=5, le=240),
+    max_legs: int = Query(3, ge=1, le=4),
+    db: sqlite3.Connection = Depends(get_db),
+):
+    graph = get_graph(lambda: airports_key(db), lambda: _load_airports(db))
+    code = origin.upper().strip()
+    if code not in graph.index:
+        return {"error": "bad origin"}
+
+    res, cached = cached_search(graph, code, minutes, max_legs)
+    if res is None:
+        return {"error": "no route"}
+
+    return {
+        "origin": graph.airports[graph.index[code]].as_dict(),
+        "minutes": minutes,
+        "legs": res["legs"],
+        "total_minutes": res["total_minutes"],
+        "error_minutes": abs(res["total_minutes"] - minutes),
+        "complete": res["complete"],
+        "cached": cached,
+    }
 
 
 @router.get("/plan")
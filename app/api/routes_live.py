@@ -0,0 +1,186 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.db import DEFAULT_TENANT
+from app.core.metrics import metrics
+from app.repositories.sessions_repo import SessionsRepo
+from app.repositories.shards import valid_tenant
+
+router = APIRouter(prefix="/api", tags=["live"])
+repo = SessionsRepo()
+
+MAX_BATCH = 64
+_live_connections = 0
+WRITE_EVENTS = {"distraction", "checkpoint"}
+CONTROL_EVENTS = {"pause", "resume", "ping"}
+
+metrics.gauge("focusflight_live_connections", "Open live session WebSockets.", lambda: _live_connections)
+
+
+def _elapsed_since(started_at: str) -> float:
+    try:
+        started = datetime.fromisoformat(started_at)
+    except (TypeError, ValueError):
+        return 0.0
+    return max(0.0, (datetime.now(timezone.utc) - started).total_seconds())
+
+
+class _FlightClock:
+    # серверные часы полёта: клиент присылает elapsed при pause/resume, чтобы не разъезжаться
+    def __init__(self, elapsed: float):
+        self.anchor = time.monotonic() - elapsed
+        self.paused_at: float | None = None
+
+    def elapsed(self) -> float:
+        if self.paused_at is not None:
+            return self.paused_at
+        return time.monotonic() - self.anchor
+
+    def pause(self, elapsed: float | None) -> None:
+        self.paused_at = self.elapsed() if elapsed is None else elapsed
+
+    def resume(self, elapsed: float | None) -> None:
+        base = self.elapsed() if elapsed is None else elapsed
+        self.paused_at = None
+        self.anchor = time.monotonic() - base
+
+
+def _as_seconds(v) -> float | None:
+    try:
+        return max(0.0, float(v))
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_event(m) -> dict:
+    if not isinstance(m, dict):
+        return {"type": "bad", "seq": None}
+
+    kind = m.get("type")
+    ev = {"type": kind, "seq": m.get("seq")}
+    if kind in WRITE_EVENTS:
+        note = m.get("note")
+        ev["note"] = (note.strip() or None) if isinstance(note, str) else None
+    if kind == "checkpoint":
+        try:
+            ev["checkpoint_id"] = int(m.get("checkpoint_id"))
+        except (TypeError, ValueError):
+            ev["type"] = "bad"
+    if kind in {"pause", "resume"}:
+        ev["elapsed"] = _as_seconds(m.get("elapsed"))
+    return ev
+
+
+@router.websocket("/session/{session_id}/live")
+async def session_live(ws: WebSocket, session_id: int, tenant: str = DEFAULT_TENANT):
+    # браузерный WebSocket не умеет свои заголовки, тенант приходит в ?tenant=
+    if not valid_tenant(tenant):
+        await ws.close(code=4400)
+        return
+    r = repo.for_tenant(tenant)
+    s = await run_in_threadpool(r.get_open_session, session_id)
+    if not s:
+        await ws.close(code=4400)
+        return
+    await ws.accept()
+
+    global _live_connections
+    inbox: asyncio.Queue = asyncio.Queue()
+    # код закрытия, если клиент нарушил протокол (бинарный кадр)
+    close_code: int | None = None
+
+    async def reader():
+        nonlocal close_code
+        try:
+            while True:
+                message = await ws.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                text = message.get("text")
+                if text is None:
+                    close_code = 1003
+                    break
+                try:
+                    await inbox.put(json.loads(text))
+                except ValueError:
+                    # битый кадр — ошибка одного события, не разрыв: уйдёт ack "bad event"
+                    await inbox.put({"type": "bad", "seq": None})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await inbox.put(None)
+
+    reader_task: asyncio.Task | None = None
+    try:
+        _live_connections += 1
+        cps = await run_in_threadpool(r.list_checkpoints, session_id)
+        pending = [c for c in cps if c["completed_at"] is None]
+        clock = _FlightClock(_elapsed_since(s["started_at"]))
+        reader_task = asyncio.create_task(reader())
+
+        while True:
+            # пушим чекпоинты, которые уже наступили
+            while pending and clock.paused_at is None and clock.elapsed() >= pending[0]["due_seconds"]:
+                cp = pending.pop(0)
+                await ws.send_json({
+                    "type": "checkpoint_due",
+                    "checkpoint_id": cp["id"],
+                    "idx": cp["idx"],
+                    "due_seconds": cp["due_seconds"],
+                })
+
+            timeout = None
+            if pending and clock.paused_at is None:
+                timeout = max(0.0, pending[0]["due_seconds"] - clock.elapsed())
+
+            try:
+                msg = await asyncio.wait_for(inbox.get(), timeout)
+            except asyncio.TimeoutError:
+                continue
+
+            # всё, что накопилось пока писали прошлый батч, уходит одной транзакцией
+            batch = [msg]
+            while len(batch) < MAX_BATCH and not inbox.empty():
+                batch.append(inbox.get_nowait())
+
+            closed = None in batch
+            batch = [m for m in batch if m is not None]
+
+            events = [_parse_event(m) for m in batch]
+            for ev in events:
+                if ev["type"] == "pause":
+                    clock.pause(ev["elapsed"])
+                elif ev["type"] == "resume":
+                    clock.resume(ev["elapsed"])
+
+            writes = [ev for ev in events if ev["type"] in WRITE_EVENTS]
+            results = await run_in_threadpool(r.apply_events, session_id, writes) if writes else []
+            errors = iter(results)
+
+            for ev in events:
+                ack = {"type": "ack", "seq": ev["seq"], "ok": True}
+                if ev["type"] in WRITE_EVENTS:
+                    err = next(errors)
+                    if err:
+                        ack.update(ok=False, error=err)
+                    elif ev["type"] == "checkpoint":
+                        pending = [c for c in pending if c["id"] != ev["checkpoint_id"]]
+                elif ev["type"] not in CONTROL_EVENTS:
+                    ack.update(ok=False, error="bad event")
+                await ws.send_json(ack)
+
+            if closed:
+                if close_code is not None:
+                    await ws.close(code=close_code)
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if reader_task is not None:
+            reader_task.cancel()
+        _live_connections -= 1
@@ -1,14 +1,32 @@
+import hashlib
+
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
+from app.core.assets import asset_url, assets_version
 from app.core.config import settings
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_url"] = asset_url
+
+# assets version -> (html, etag); страница зависит только от заголовка и версии ассетов
+_index_cache: dict[str, tuple[bytes, str]] = {}
+
+def _render_index() -> tuple[bytes, str]:
+    version = assets_version()
+    cached = _index_cache.get(version)
+    if cached is None:
+        html = templates.get_template("index.html").render(title=settings.app_title).encode("utf-8")
+        cached = (html, f'"{hashlib.sha256(html).hexdigest()[:16]}"')
+        _index_cache.clear()
+        _index_cache[version] = cached
+    return cached
 
 @router.get("/", response_class=HTMLResponse)
 def index(request: Request):
-    return templates.TemplateResponse(
-        "index.html",
-        {"request": request, "title": settings.app_title}
-    )
+    html, etag = _render_index()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(html, headers=headers)
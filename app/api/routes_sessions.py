@@ -1,5 +1,9 @@
-from fastapi import APIRouter, Body
+import base64
+from datetime import date, timedelta
+
+from fastapi import APIRouter, Body, Depends, Query
 from fastapi.responses import JSONResponse
+from app.api.deps import tenant_id
 from app.repositories.sessions_repo import SessionsRepo
 from app.services.grading import grade_from_altitude
 
@@ -7,45 +11,47 @@ router = APIRouter(prefix="/api", tags=["sessions"])
 repo = SessionsRepo()
 
 @router.post("/session/start")
-def session_start(payload: dict = Body(...)):
+def session_start(payload: dict = Body(...), tenant: str = Depends(tenant_id)):
     subject = (payload.get("subject") or "Study").strip()
     planned_minutes = int(payload.get("planned_minutes") or 50)
     planned_minutes = max(5, min(240, planned_minutes))
 
-    sid = repo.create_session(subject, planned_minutes)
-    repo.ensure_checkpoints(sid, planned_minutes)
+    r = repo.for_tenant(tenant)
+    sid = r.create_session(subject, planned_minutes)
+    r.ensure_checkpoints(sid, planned_minutes)
 
     return {"session_id": sid, "planned_minutes": planned_minutes}
 
 @router.post("/distraction")
-def distraction(payload: dict = Body(...)):
+def distraction(payload: dict = Body(...), tenant: str = Depends(tenant_id)):
     try:
         session_id = int(payload.get("session_id"))
         note = (payload.get("note") or "").strip() or None
-        repo.add_distraction(session_id, note)
+        repo.for_tenant(tenant).add_distraction(session_id, note)
         return {"ok": True}
     except Exception:
         return JSONResponse({"error": "invalid session"}, status_code=400)
 
 @router.get("/session/{session_id}/checkpoints")
-def checkpoints(session_id: int):
-    s = repo.get_open_session(session_id)
+def checkpoints(session_id: int, tenant: str = Depends(tenant_id)):
+    r = repo.for_tenant(tenant)
+    s = r.get_open_session(session_id)
     if not s:
         return JSONResponse({"error": "invalid session"}, status_code=400)
-    return {"items": repo.list_checkpoints(session_id)}
+    return {"items": r.list_checkpoints(session_id)}
 
 @router.post("/checkpoint/complete")
-def checkpoint_complete(payload: dict = Body(...)):
+def checkpoint_complete(payload: dict = Body(...), tenant: str = Depends(tenant_id)):
     try:
         checkpoint_id = int(payload.get("checkpoint_id"))
         note = (payload.get("note") or "").strip() or None
-        repo.complete_checkpoint(checkpoint_id, note)
+        repo.for_tenant(tenant).complete_checkpoint(checkpoint_id, note)
         return {"ok": True}
     except Exception:
         return JSONResponse({"error": "not found"}, status_code=404)
 
 @router.post("/session/end")
-def session_end(payload: dict = Body(...)):
+def session_end(payload: dict = Body(...), tenant: str = Depends(tenant_id)):
     try:
         session_id = int(payload.get("session_id"))
         actual_seconds = int(payload.get("actual_seconds") or 0)
@@ -57,12 +63,50 @@ def session_end(payload: dict = Body(...)):
         turbulence_end = max(0, turbulence_end)
 
         grade = grade_from_altitude(altitude_end)
-        repo.end_session(session_id, actual_seconds, altitude_end, turbulence_end, grade)
+        repo.for_tenant(tenant).end_session(session_id, actual_seconds, altitude_end, turbulence_end, grade)
         return {"ok": True, "grade": grade}
     except Exception:
         return JSONResponse({"error": "bad request"}, status_code=400)
 
 @router.get("/sessions/recent")
-def sessions_recent(limit: int = 10):
+def sessions_recent(limit: int = 10, tenant: str = Depends(tenant_id)):
     limit = max(1, min(50, int(limit)))
-    return {"items": repo.recent_sessions(limit)}
+    return {"items": repo.for_tenant(tenant).recent_sessions(limit)}
+
+def _encode_cursor(before_id: int) -> str:
+    return base64.urlsafe_b64encode(f"s1:{before_id}".encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> int:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    prefix, _, value = raw.partition(":")
+    if prefix != "s1":
+        raise ValueError("bad cursor")
+    return int(value)
+
+@router.get("/sessions")
+def sessions_history(
+    cursor: str | None = Query(None, max_length=64),
+    before_id: int | None = Query(None, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    subject: str | None = Query(None, max_length=120),
+    grade: str | None = Query(None, pattern="^[A-D]$"),
+    date_from: date | None = None,
+    date_to: date | None = None,
+    tenant: str = Depends(tenant_id),
+):
+    if cursor:
+        try:
+            before_id = _decode_cursor(cursor)
+        except Exception:
+            return JSONResponse({"error": "bad cursor"}, status_code=400)
+
+    items = repo.for_tenant(tenant).history_page(
+        before_id=before_id,
+        limit=limit,
+        subject=subject.strip() if subject else None,
+        grade=grade,
+        started_from=date_from.isoformat() if date_from else None,
+        started_before=(date_to + timedelta(days=1)).isoformat() if date_to else None,
+    )
+    next_cursor = _encode_cursor(items[-1]["id"]) if len(items) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
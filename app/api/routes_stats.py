@@ -1,9 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from app.api.deps import tenant_id
 from app.repositories.sessions_repo import SessionsRepo
 
 router = APIRouter(prefix="/api", tags=["stats"])
 repo = SessionsRepo()
 
 @router.get("/stats/today")
-def stats_today():
-    return repo.today_stats()
+def stats_today(tenant: str = Depends(tenant_id)):
+    return repo.for_tenant(tenant).today_stats()
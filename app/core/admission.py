@@ -0,0 +1,179 @@
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+WRITE = "write"
+PLAN = "plan"
+BULK = "bulk"
+
+# (method, path prefix, class, per-route limit); первое совпадение; чего нет в списке — без ограничений
+RULES: list[tuple[str, str, str, int | None]] = [
+    ("POST", "/api/session/", WRITE, None),
+    ("POST", "/api/distraction", WRITE, None),
+    ("POST", "/api/checkpoint/", WRITE, None),
+    ("GET", "/api/export/", BULK, settings.admission_export_limit),
+    ("GET", "/api/ife/airports", BULK, None),
+    ("GET", "/api/ife/", PLAN, None),
+    ("GET", "/api/session", PLAN, None),
+    ("GET", "/api/stats/", PLAN, None),
+]
+
+admission_shed = metrics.counter(
+    "focusflight_admission_shed_total",
+    "Requests rejected by admission control, by class and reason (queue_full -> 429, deadline -> 503).",
+)
+admission_wait = metrics.histogram("focusflight_admission_wait_seconds", "Time admitted requests spent queued, by class.")
+
+
+@dataclass
+class PriorityClass:
+    name: str
+    limit: int
+    deadline_s: float
+    active: int = 0
+    # (future, route prefix, route limit) в порядке прихода
+    waiters: deque = field(default_factory=deque)
+
+
+class Admission:
+    """In-flight slots shared by priority classes; a freed slot goes to the oldest eligible waiter
+    of the highest class. Runs on the event loop only, so no locks."""
+
+    def __init__(self, max_inflight: int, classes: list[PriorityClass], queue_size: int):
+        self.max_inflight = max(1, max_inflight)
+        self.classes = {c.name: c for c in classes}
+        self.order = classes
+        self.queue_size = queue_size
+        self.active = 0
+        self._routes: dict[str, int] = {}
+
+    def _eligible(self, c: PriorityClass, route: str, route_limit: int | None) -> bool:
+        if self.active >= self.max_inflight or c.active >= c.limit:
+            return False
+        return route_limit is None or self._routes.get(route, 0) < route_limit
+
+    def _take(self, c: PriorityClass, route: str) -> None:
+        self.active += 1
+        c.active += 1
+        self._routes[route] = self._routes.get(route, 0) + 1
+
+    def release(self, c: PriorityClass, route: str) -> None:
+        self.active -= 1
+        c.active -= 1
+        self._routes[route] -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for c in self.order:
+            for w in list(c.waiters):
+                if self.active >= self.max_inflight:
+                    return
+                fut, route, route_limit = w
+                if fut.done():
+                    c.waiters.remove(w)
+                    continue
+                if self._eligible(c, route, route_limit):
+                    c.waiters.remove(w)
+                    self._take(c, route)
+                    fut.set_result(True)
+
+    async def acquire(self, c: PriorityClass, route: str, route_limit: int | None) -> str | None:
+        """None when admitted (caller must release), otherwise the shed reason."""
+        # ждущие остаются в очереди только пока им нельзя (release сразу раздаёт слоты),
+        # так что новый запрос никого не обгоняет
+        if self._eligible(c, route, route_limit):
+            self._take(c, route)
+            return None
+        if len(c.waiters) >= self.queue_size:
+            return "queue_full"
+
+        fut = asyncio.get_running_loop().create_future()
+        w = (fut, route, route_limit)
+        c.waiters.append(w)
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(fut, c.deadline_s)
+        except asyncio.TimeoutError:
+            # 3.12+: wait_for может бросить TimeoutError уже после set_result — слот выдан, вернуть
+            if fut.done() and not fut.cancelled():
+                self.release(c, route)
+            return "deadline"
+        except BaseException:
+            # клиент ушёл, пока ждал; если слот уже выдан — отдаём его обратно
+            if fut.done() and not fut.cancelled():
+                self.release(c, route)
+            raise
+        finally:
+            if w in c.waiters:
+                c.waiters.remove(w)
+        admission_wait.observe(time.perf_counter() - t0, **{"class": c.name})
+        return None
+
+    def queue_depth(self) -> dict[tuple, float]:
+        return {(("class", c.name),): len(c.waiters) for c in self.order}
+
+    def inflight(self) -> dict[tuple, float]:
+        return {(("class", c.name),): c.active for c in self.order}
+
+
+def classify(method: str, path: str) -> tuple[str, str, int | None] | None:
+    method = "GET" if method == "HEAD" else method
+    for m, prefix, cls, route_limit in RULES:
+        if method == m and path.startswith(prefix):
+            return cls, prefix, route_limit
+    return None
+
+
+def _new_admission() -> Admission:
+    return Admission(
+        settings.admission_max_inflight,
+        [
+            PriorityClass(WRITE, settings.admission_max_inflight, settings.admission_write_deadline_ms / 1000),
+            PriorityClass(PLAN, settings.admission_plan_limit, settings.admission_plan_deadline_ms / 1000),
+            PriorityClass(BULK, settings.admission_bulk_limit, settings.admission_bulk_deadline_ms / 1000),
+        ],
+        settings.admission_queue_size,
+    )
+
+
+admission = _new_admission()
+metrics.gauge("focusflight_admission_queue_depth", "Requests waiting for an admission slot, by class.", admission.queue_depth)
+metrics.gauge("focusflight_admission_inflight", "Admitted requests in progress, by class.", admission.inflight)
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware: per-class/per-route concurrency limits, priority queues, fast 429/503."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        match = classify(scope.get("method", ""), scope["path"]) if scope["type"] == "http" else None
+        if match is None:
+            await self.app(scope, receive, send)
+            return
+
+        name, route, route_limit = match
+        c = admission.classes[name]
+        reason = await admission.acquire(c, route, route_limit)
+        if reason is not None:
+            admission_shed.inc(**{"class": name, "reason": reason})
+            status = 429 if reason == "queue_full" else 503
+            response = JSONResponse(
+                {"error": "overloaded"}, status_code=status,
+                headers={"Retry-After": str(max(1, math.ceil(c.deadline_s)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(c, route)
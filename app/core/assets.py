@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import stat
+from pathlib import Path
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+
+from app.core.config import settings
+
+ASSETS_URL = "/assets"
+STATIC_URL = "/static"
+IMMUTABLE = "public, max-age=31536000, immutable"
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".html", ".txt", ".map"}
+MANIFEST = "manifest.json"
+
+_manifest: dict[str, str] = {}
+_version = ""
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # несколько воркеров могут собирать одновременно: пишем во временный файл и подменяем
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def build_assets(src: str | None = None, out: str | None = None) -> dict[str, str]:
+    """Copy every static file to a content-hashed name (plus .gz) and write the manifest."""
+    global _manifest, _version
+    src_dir = Path(src or settings.static_dir)
+    out_dir = Path(out or settings.assets_dir)
+
+    manifest: dict[str, str] = {}
+    for f in sorted(src_dir.rglob("*")):
+        if not f.is_file() or f.name.startswith("."):
+            continue
+        logical = f.relative_to(src_dir).as_posix()
+        data = f.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        hashed = f"{Path(logical).with_suffix('').as_posix()}.{digest}{f.suffix}"
+        manifest[logical] = hashed
+
+        target = out_dir / hashed
+        if target.exists():
+            continue
+        _write_atomic(target, data)
+        if f.suffix in COMPRESSIBLE:
+            gz = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(gz) < len(data):
+                _write_atomic(target.with_name(target.name + ".gz"), gz)
+
+    _write_atomic(out_dir / MANIFEST, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    _manifest = manifest
+    _version = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:12]
+    return manifest
+
+
+def load_manifest(out: str | None = None) -> dict[str, str]:
+    """Pick up a manifest written by build_assets() in another process (multi-worker serving)."""
+    global _manifest, _version
+    path = Path(out or settings.assets_dir) / MANIFEST
+    if not path.exists():
+        return build_assets(out=out)
+    manifest = json.loads(path.read_text())
+    _manifest = manifest
+    _version = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:12]
+    return manifest
+
+
+def asset_url(logical: str) -> str:
+    hashed = _manifest.get(logical)
+    if hashed is None:
+        return f"{STATIC_URL}/{logical}"
+    return f"{ASSETS_URL}/{hashed}"
+
+
+def assets_version() -> str:
+    return _version
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Serves fingerprinted assets: prebuilt .gz when the client accepts gzip, always immutable."""
+
+    async def get_response(self, path: str, scope) -> Response:
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        response = None
+        if "gzip" in accept and scope["method"] in ("GET", "HEAD"):
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + ".gz")
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                response = FileResponse(
+                    full_path, stat_result=stat_result, method=scope["method"], media_type=media_type,
+                    headers={"Content-Encoding": "gzip"},
+                )
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = IMMUTABLE
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+if __name__ == "__main__":
+    for logical, hashed in build_assets().items():
+        print(f"{logical} -> {hashed}")
@@ -1,8 +1,101 @@
+import multiprocessing
+import os
 from dataclasses import dataclass
 
+
+def _worker_process() -> bool:
+    # uvicorn --workers N запускает воркеров через multiprocessing (spawn): у них есть родитель
+    return multiprocessing.parent_process() is not None
+
 @dataclass(frozen=True)
 class Settings:
     app_title: str = "FocusFlight"
-    db_path: str = "focusflight.db"
+    db_path: str = os.getenv("FOCUSFLIGHT_DB_PATH", "focusflight.db")
+
+    # several uvicorn workers share one SQLite file: set by `python -m app.serve`,
+    # detected for plain `uvicorn --workers N`
+    multiprocess: bool = os.getenv("FOCUSFLIGHT_MULTIPROCESS", "0") == "1" or _worker_process()
+    sqlite_busy_timeout_ms: int = 5000
+    busy_retries: int = 5
+    busy_backoff_ms: int = 25
+
+    # sessions sharding by tenant (X-FocusFlight-Tenant): "off" = everything in db_path,
+    # "hash" = shard_count files in shard_dir, "tenant" = one file per tenant.
+    # Placement is recorded per tenant on first use; tools/rebalance_shards.py moves tenants.
+    shard_mode: str = os.getenv("FOCUSFLIGHT_SHARD_MODE", "off")
+    shard_count: int = int(os.getenv("FOCUSFLIGHT_SHARD_COUNT", "4"))
+    shard_dir: str = os.getenv("FOCUSFLIGHT_SHARD_DIR", "shards")
+    # shards kept open per process (schema checked, open sessions loaded); LRU beyond that
+    shard_handles: int = int(os.getenv("FOCUSFLIGHT_SHARD_HANDLES", "32"))
+
+    static_dir: str = "app/static"
+    # fingerprinted + gzipped copies of static_dir, served from /assets with immutable caching
+    assets_dir: str = os.getenv("FOCUSFLIGHT_ASSETS_DIR", "build/assets")
+
+    # retention: ended sessions older than this get their distractions/checkpoints folded into
+    # summary columns and moved to monthly archive files (tools/archive_sessions.py, POST /api/admin/archive)
+    archive_after_days: int = int(os.getenv("FOCUSFLIGHT_ARCHIVE_AFTER_DAYS", "90"))
+    archive_dir: str = os.getenv("FOCUSFLIGHT_ARCHIVE_DIR", "archive")
+    archive_batch: int = 500
+    # free pages released per incremental_vacuum transaction, and the pause between them
+    archive_vacuum_pages: int = 256
+    archive_vacuum_pause_ms: int = 5
+    distraction_histogram_bucket_s: int = 5 * 60
+
+    # open sessions with no activity for planned duration + grace are closed
+    session_abandon_grace_s: int = 2 * 60 * 60
+    session_sweep_interval_s: int = 60
+    # session_changes rows kept per shard for other workers' registries (pruned by the sweeper)
+    session_changes_keep: int = 10000
+
+    # /api/ife/itinerary: search time budget, results cached per (origin, minutes bucket, max_legs)
+    itinerary_budget_ms: int = int(os.getenv("FOCUSFLIGHT_ITINERARY_BUDGET_MS", "30"))
+    itinerary_bucket_min: int = 5
+    itinerary_cache_size: int = 4096
+    # how often the airports table fingerprint is re-read (itinerary graph, pool workers' tables)
+    airports_check_s: float = 30.0
+
+    # CPU-bound IFE work (timezone lookup, /pick scan, search ranking) in a process pool so it
+    # does not hold the GIL of the serving process; 0 = in-process. Pool per serving worker.
+    ife_pool_size: int = int(os.getenv("FOCUSFLIGHT_IFE_POOL_SIZE", "0"))
+    # still queued after this long: computed in-process instead; already running: waited for once
+    # more, then the request gets 503
+    ife_pool_timeout_ms: int = int(os.getenv("FOCUSFLIGHT_IFE_POOL_TIMEOUT_MS", "500"))
+    # after a worker crash the pool is dropped; a new one is started after this pause
+    ife_pool_retry_s: float = 30.0
+
+    # admission control: in-flight limits per priority class (write > plan > bulk) with bounded,
+    # deadline-bound queues; the rest gets 429 (queue full) / 503 (waited too long) + Retry-After.
+    # Limits are per serving process.
+    admission_enabled: bool = os.getenv("FOCUSFLIGHT_ADMISSION", "1") == "1"
+    # below the threadpool size (40): session writes always find a thread for their sync handler
+    admission_max_inflight: int = int(os.getenv("FOCUSFLIGHT_ADMISSION_MAX_INFLIGHT", "32"))
+    admission_plan_limit: int = int(os.getenv("FOCUSFLIGHT_ADMISSION_PLAN_LIMIT", "12"))
+    admission_bulk_limit: int = int(os.getenv("FOCUSFLIGHT_ADMISSION_BULK_LIMIT", "4"))
+    # CSV exports scan whole tables: fewer of them at once than other bulk routes
+    admission_export_limit: int = 2
+    admission_queue_size: int = 64
+    admission_write_deadline_ms: int = 2000
+    admission_plan_deadline_ms: int = 500
+    admission_bulk_deadline_ms: int = 250
+
+    # /metrics + per-route timing + SQL tracing; off = plain sqlite3 connections, no middleware
+    metrics_enabled: bool = os.getenv("FOCUSFLIGHT_METRICS", "0") == "1"
+
+    # per-request profiling: an X-FocusFlight-Profile header carrying this token
+    admin_token: str = os.getenv("FOCUSFLIGHT_ADMIN_TOKEN", "")
+    profile_dir: str = os.getenv("FOCUSFLIGHT_PROFILE_DIR", "profiles")
+    profile_sample_rate: float = float(os.getenv("FOCUSFLIGHT_PROFILE_SAMPLE_RATE", "1.0"))
+    profile_max_bytes: int = int(os.getenv("FOCUSFLIGHT_PROFILE_MAX_BYTES", str(64 * 1024 * 1024)))
+    # 0 = slow-request log off
+    slow_request_ms: int = int(os.getenv("FOCUSFLIGHT_SLOW_REQUEST_MS", "0"))
+
+    @property
+    def profiling_enabled(self) -> bool:
+        return bool(self.admin_token)
+
+    @property
+    def sql_tracing_needed(self) -> bool:
+        return self.profiling_enabled or self.slow_request_ms > 0
 
 settings = Settings()
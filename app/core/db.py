@@ -1,15 +1,85 @@
+import functools
+import random
 import sqlite3
+import time
 from app.core.config import settings
+from app.core.metrics import connection_factory, metrics
 
-def connect() -> sqlite3.Connection:
-    con = sqlite3.connect(settings.db_path)
+busy_retries = metrics.counter("focusflight_sqlite_busy_retries_total", "Writes retried after SQLITE_BUSY.")
+
+# rows written before tenants existed (and requests without a tenant) belong here
+DEFAULT_TENANT = "default"
+
+def connect(path: str | None = None) -> sqlite3.Connection:
+    # path: shard file (app.repositories.shards); None = the main database
+    con = sqlite3.connect(
+        path or settings.db_path,
+        timeout=settings.sqlite_busy_timeout_ms / 1000,
+        factory=connection_factory("core"),
+    )
     con.row_factory = sqlite3.Row
     con.execute("PRAGMA foreign_keys = ON;")
     return con
 
+def _is_busy(e: sqlite3.OperationalError) -> bool:
+    code = getattr(e, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+def retry_busy(fn):
+    # busy_timeout уже ждёт внутри SQLite; это страховка сверху с ограниченным числом попыток
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(settings.busy_retries + 1):
+            try:
+                return fn(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if attempt >= settings.busy_retries or not _is_busy(e):
+                    raise
+                busy_retries.inc(fn=fn.__name__)
+                base = settings.busy_backoff_ms * (2 ** attempt)
+                time.sleep(random.uniform(base / 2, base) / 1000)
+    return wrapper
+
+# cross-process invalidation: writers log the session they changed in the same transaction,
+# other workers re-read only the sessions logged after the last seq they applied
+def log_session_change(cur: sqlite3.Cursor, session_id: int) -> int:
+    cur.execute("INSERT INTO session_changes(session_id) VALUES (?)", (session_id,))
+    return int(cur.lastrowid)
+
+def read_change_seq(con: sqlite3.Connection) -> int:
+    row = con.execute("SELECT MAX(seq) FROM session_changes").fetchone()
+    return int(row[0] or 0)
+
+def _ensure_column(cur: sqlite3.Cursor, table: str, column: str, decl: str) -> None:
+    cols = {r[1] for r in cur.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in cols:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl};")
+
 def init_db() -> None:
     con = connect()
     cur = con.cursor()
+    init_sessions_schema(cur)
+
+    # tenant -> shard directory (app.repositories.shards); lives only in the main database
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS tenant_shards (
+        tenant TEXT PRIMARY KEY,
+        shard TEXT NOT NULL
+    );
+    """)
+
+    con.commit()
+    con.close()
+
+def init_sessions_schema(cur: sqlite3.Cursor) -> None:
+    """Sessions/distractions/checkpoints tables; the same schema in the main DB and every shard."""
+    # только для новой базы; существующие переводит tools/archive_sessions.py --convert (полный VACUUM)
+    cur.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    # WAL: читатели не блокируют писателя, несколько воркеров на одном файле
+    cur.execute("PRAGMA journal_mode = WAL;")
 
     cur.execute("""
     CREATE TABLE IF NOT EXISTS sessions (
@@ -23,9 +93,17 @@ def init_db() -> None:
         distractions_count INTEGER DEFAULT 0,
         altitude_end INTEGER DEFAULT 100,
         turbulence_end INTEGER DEFAULT 0,
-        grade TEXT DEFAULT NULL
+        grade TEXT DEFAULT NULL,
+        tenant TEXT NOT NULL DEFAULT 'default'
     );
     """)
+    _ensure_column(cur, "sessions", "tenant", "TEXT NOT NULL DEFAULT 'default'")
+
+    # сводка по событиям архивированной сессии (сырые строки лежат в archive_dir/<shard>/<YYYY-MM>.db)
+    _ensure_column(cur, "sessions", "checkpoints_total", "INTEGER")
+    _ensure_column(cur, "sessions", "checkpoints_completed", "INTEGER")
+    _ensure_column(cur, "sessions", "distraction_histogram", "TEXT")
+    _ensure_column(cur, "sessions", "archived_month", "TEXT")
 
     cur.execute("""
     CREATE TABLE IF NOT EXISTS distractions (
@@ -50,5 +128,61 @@ def init_db() -> None:
     );
     """)
 
-    con.commit()
-    con.close()
+    # открытые сессии: загрузка реестра и sweeper по невыгруженным шардам
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_open ON sessions(id) WHERE ended_at IS NULL;")
+
+    # догрузка одной открытой сессии в реестр (SessionsRepo._open) и архивация по session_id
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_checkpoints_session ON checkpoints(session_id);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_distractions_session ON distractions(session_id);")
+
+    # индексы до появления тенантов
+    for old in ("idx_sessions_history_subject", "idx_sessions_history_grade", "idx_sessions_started_at"):
+        cur.execute(f"DROP INDEX IF EXISTS {old};")
+
+    # история: каждая страница /api/sessions = range scan по одному из этих индексов
+    # (в шарде несколько тенантов, поэтому tenant всегда первый)
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_sessions_tenant_history ON sessions(tenant, id)
+    WHERE ended_at IS NOT NULL;
+    """)
+
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_sessions_tenant_subject ON sessions(
+        tenant, subject, id, grade, started_at, planned_minutes, ended_at, actual_seconds,
+        distractions_count, altitude_end, turbulence_end
+    ) WHERE ended_at IS NOT NULL;
+    """)
+
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_sessions_tenant_grade ON sessions(
+        tenant, grade, id, subject, started_at, planned_minutes, ended_at, actual_seconds,
+        distractions_count, altitude_end, turbulence_end
+    ) WHERE ended_at IS NOT NULL;
+    """)
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_tenant_started_at ON sessions(tenant, started_at);")
+
+    # очередь на архивацию и список архивных месяцев тенанта
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_sessions_unarchived ON sessions(ended_at)
+    WHERE archived_month IS NULL AND ended_at IS NOT NULL;
+    """)
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_sessions_archived_month ON sessions(tenant, archived_month)
+    WHERE archived_month IS NOT NULL;
+    """)
+
+    # журнал изменений открытых сессий для других воркеров; AUTOINCREMENT: seq не переиспользуется после чистки
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS session_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER NOT NULL
+    );
+    """)
+
+    # открытые сессии, начатые до того, как счётчик отвлечений стал вестись на лету
+    cur.execute("""
+    UPDATE sessions
+    SET distractions_count = (SELECT COUNT(*) FROM distractions d WHERE d.session_id = sessions.id)
+    WHERE ended_at IS NULL;
+    """)
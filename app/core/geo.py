@@ -0,0 +1,38 @@
+import math
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    r = 6371.0
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (math.sin(dlat / 2) ** 2) + math.cos(p1) * math.cos(p2) * (math.sin(dlon / 2) ** 2)
+    return 2 * r * math.asin(math.sqrt(a))
+
+
+def bearing_deg(lat1, lon1, lat2, lon2) -> float:
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dlon = math.radians(lon2 - lon1)
+    x = math.sin(dlon) * math.cos(p2)
+    y = math.cos(p1) * math.sin(p2) - math.sin(p1) * math.cos(p2) * math.cos(dlon)
+    return (math.degrees(math.atan2(x, y)) + 360.0) % 360.0
+
+
+def lerp(a: float, b: float, t: float) -> float:
+    return a + (b - a) * t
+
+
+CRUISE_KMH = 820.0
+OVERHEAD_MIN = 22.0
+
+
+def estimate_duration_minutes(distance_km: float) -> int:
+    mins = (distance_km / CRUISE_KMH) * 60.0 + OVERHEAD_MIN
+    return max(5, int(round(mins)))
+
+
+def distance_for_minutes(minutes: float) -> float:
+    # обратная к estimate_duration_minutes (без округления)
+    return max(0.0, (minutes - OVERHEAD_MIN) / 60.0 * CRUISE_KMH)
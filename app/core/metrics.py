@@ -0,0 +1,296 @@
+import bisect
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable
+
+from app.core.config import settings
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict[str, str] | None) -> Labels:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: Labels, extra: tuple[str, str] | None = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1.0, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, v in sorted(self._values.items()):
+            out.append(f"{self.name}{_fmt_labels(key)} {v:g}")
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # labels -> [bucket counts..., +Inf count], sum
+        self._values: dict[Labels, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[i] += 1
+            total[0] += value
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._values.items()):
+            acc = 0
+            for le, c in zip(self.buckets, counts):
+                acc += c
+                out.append(f"{self.name}_bucket{_fmt_labels(key, ('le', f'{le:g}'))} {acc}")
+            acc += counts[-1]
+            out.append(f"{self.name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(key)} {total[0]:.6f}")
+            out.append(f"{self.name}_count{_fmt_labels(key)} {acc}")
+        return out
+
+
+class Gauge:
+    # значение снимается в момент скрейпа: fn() -> число или {labels: число}
+    def __init__(self, name: str, help: str, fn: Callable[[], float | dict[tuple, float]]):
+        self.name = name
+        self.help = help
+        self.fn = fn
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.fn()
+        except Exception:
+            return out
+        if isinstance(value, dict):
+            for key, v in sorted(value.items()):
+                out.append(f"{self.name}{_fmt_labels(_labels(dict(key)))} {float(v):g}")
+        else:
+            out.append(f"{self.name} {float(value):g}")
+        return out
+
+
+class Registry:
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._metrics: dict[str, Counter | Histogram | Gauge] = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def gauge(self, name: str, help: str, fn: Callable[[], float | dict[tuple, float]]) -> Gauge:
+        g = Gauge(name, help, fn)
+        self._metrics[name] = g
+        return g
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Registry(enabled=settings.metrics_enabled)
+
+http_requests = metrics.counter("focusflight_http_requests_total", "HTTP requests by route, method and status.")
+http_latency = metrics.histogram("focusflight_http_request_seconds", "HTTP request latency by route.")
+db_connections = metrics.counter("focusflight_db_connections_total", "SQLite connections opened, by DB layer.")
+sql_queries = metrics.counter("focusflight_sql_queries_total", "SQL statements executed, by DB layer.")
+sql_seconds = metrics.counter("focusflight_sql_seconds_total", "Time spent in execute/fetch, by DB layer.")
+request_sql_queries = metrics.histogram(
+    "focusflight_request_sql_queries", "SQL statements per request, by route.", COUNT_BUCKETS
+)
+request_sql_seconds = metrics.histogram("focusflight_request_sql_seconds", "SQL time per request, by route.")
+
+
+MAX_CAPTURED_STATEMENTS = 200
+
+
+@dataclass
+class RequestSql:
+    queries: int = 0
+    seconds: float = 0.0
+    # [sql, seconds] per statement; only filled when someone (slow log, profiler) asked for it
+    statements: list[list] | None = None
+
+
+_request_sql: ContextVar[RequestSql | None] = ContextVar("focusflight_request_sql", default=None)
+
+
+def current_request_sql() -> RequestSql | None:
+    return _request_sql.get()
+
+
+def begin_request_sql(rs: RequestSql):
+    return _request_sql.set(rs)
+
+
+def end_request_sql(token) -> None:
+    _request_sql.reset(token)
+
+
+def _record_sql(layer: str, elapsed: float, sql: str | None) -> None:
+    if sql is not None:
+        sql_queries.inc(layer=layer)
+    sql_seconds.inc(elapsed, layer=layer)
+    rs = _request_sql.get()
+    if rs is None:
+        return
+    rs.seconds += elapsed
+    if sql is not None:
+        rs.queries += 1
+    st = rs.statements
+    if st is None:
+        return
+    if sql is not None:
+        if len(st) < MAX_CAPTURED_STATEMENTS:
+            st.append([" ".join(sql.split()), elapsed])
+    elif st:
+        # время fetch докидываем последнему запросу
+        st[-1][1] += elapsed
+
+
+class TracedCursor(sqlite3.Cursor):
+    layer = "unknown"
+
+    def execute(self, sql, parameters=(), /):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_sql(self.layer, time.perf_counter() - t0, sql)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_sql(self.layer, time.perf_counter() - t0, sql)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _record_sql(self.layer, time.perf_counter() - t0, None)
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _record_sql(self.layer, time.perf_counter() - t0, None)
+
+
+class TracedConnection(sqlite3.Connection):
+    layer = "unknown"
+
+    def cursor(self, factory=None):
+        cur = super().cursor(factory or TracedCursor)
+        cur.layer = self.layer
+        return cur
+
+    def execute(self, sql, parameters=(), /):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+_traced_classes = {
+    layer: type(f"TracedConnection_{layer}", (TracedConnection,), {"layer": layer})
+    for layer in ("core", "ife")
+}
+
+
+def connection_factory(layer: str) -> type[sqlite3.Connection]:
+    # когда трассировка не нужна (ни метрик, ни slow log / профилей), отдаём обычный sqlite3.Connection
+    if not (metrics.enabled or settings.sql_tracing_needed):
+        return sqlite3.Connection
+    db_connections.inc(layer=layer)
+    return _traced_classes[layer]
+
+
+_route_paths: dict[int, dict[object, str]] = {}
+
+
+def route_label(scope) -> str:
+    # шаблон пути (/api/session/{session_id}/checkpoints), а не сырой URL
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    app = scope["app"]
+    paths = _route_paths.get(id(app))
+    if paths is None:
+        paths = {getattr(r, "endpoint", None) or getattr(r, "app", None): r.path for r in app.routes}
+        _route_paths[id(app)] = paths
+    return paths.get(endpoint, "other")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: per-route latency histogram plus per-request SQL totals."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        rs = RequestSql()
+        token = begin_request_sql(rs)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            end_request_sql(token)
+            route = route_label(scope)
+            if scope["type"] == "websocket":
+                http_requests.inc(route=route, method="WS", status="ws")
+            else:
+                http_requests.inc(route=route, method=scope["method"], status=str(status["code"] or 500))
+                http_latency.observe(elapsed, route=route)
+                request_sql_queries.observe(rs.queries, route=route)
+                request_sql_seconds.observe(rs.seconds, route=route)
@@ -0,0 +1,139 @@
+import cProfile
+import functools
+import hmac
+import inspect
+import logging
+import random
+import re
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+from app.core.metrics import RequestSql, begin_request_sql, current_request_sql, end_request_sql, route_label
+
+log = logging.getLogger("focusflight.slow")
+
+PROFILE_HEADER = b"x-focusflight-profile"
+
+_profiler: ContextVar[cProfile.Profile | None] = ContextVar("focusflight_profiler", default=None)
+
+
+def _wrap_call(call):
+    # sync-эндпоинты идут в threadpool, а cProfile видит только свой поток,
+    # поэтому профайлер включается внутри вызова, уже в рабочем потоке
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def async_wrapper(*args, **kwargs):
+            prof = _profiler.get()
+            if prof is None:
+                return await call(*args, **kwargs)
+            prof.enable()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                prof.disable()
+        return async_wrapper
+
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        prof = _profiler.get()
+        if prof is None:
+            return call(*args, **kwargs)
+        prof.enable()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            prof.disable()
+    return wrapper
+
+
+def install_profiling(app) -> None:
+    for r in app.routes:
+        if isinstance(r, APIRoute) and not getattr(r.dependant.call, "__focusflight_profiled__", False):
+            r.dependant.call = _wrap_call(r.dependant.call)
+            r.dependant.call.__focusflight_profiled__ = True
+
+
+def _requested(scope) -> bool:
+    # только заголовок: токен в query string оседает в access-логах и истории браузера
+    token = b""
+    for k, v in scope.get("headers") or []:
+        if k == PROFILE_HEADER:
+            token = v
+            break
+    return bool(token) and hmac.compare_digest(token, settings.admin_token.encode())
+
+
+def _prune(directory: Path, max_bytes: int) -> None:
+    files = sorted(directory.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in files)
+    while files and total > max_bytes:
+        oldest = files.pop(0)
+        total -= oldest.stat().st_size
+        oldest.unlink(missing_ok=True)
+
+
+def _dump(prof: cProfile.Profile, scope, route: str, elapsed: float) -> str | None:
+    directory = Path(settings.profile_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    path = directory / f"{stamp}-{scope.get('method', 'GET')}-{slug}-{int(elapsed * 1000)}ms.prof"
+    try:
+        prof.dump_stats(str(path))
+        _prune(directory, settings.profile_max_bytes)
+    except OSError:
+        log.exception("failed to write profile %s", path)
+        return None
+    return path.name
+
+
+class ProfilingMiddleware:
+    """Admin-gated cProfile of single requests (pstats files) plus a slow-request SQL log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        prof = None
+        if settings.profiling_enabled and _requested(scope) and random.random() < settings.profile_sample_rate:
+            prof = cProfile.Profile()
+
+        rs = current_request_sql()
+        token = None
+        if rs is None:
+            rs = RequestSql()
+            token = begin_request_sql(rs)
+        rs.statements = []
+
+        prof_token = _profiler.set(prof)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.perf_counter() - t0
+            _profiler.reset(prof_token)
+            if token is not None:
+                end_request_sql(token)
+
+            route = route_label(scope)
+            if prof is not None:
+                name = _dump(prof, scope, route, elapsed)
+                if name:
+                    log.info("profile written: %s (%s %.1f ms)", name, route, elapsed * 1000)
+
+            if settings.slow_request_ms and elapsed * 1000 >= settings.slow_request_ms:
+                lines = [f"  {ms * 1000:8.2f} ms  {sql}" for sql, ms in rs.statements]
+                log.warning(
+                    "slow request %s %s (%s): %.1f ms, %d queries, %.1f ms in SQL\n%s",
+                    scope.get("method"), scope.get("path"), route, elapsed * 1000,
+                    rs.queries, rs.seconds * 1000, "\n".join(lines),
+                )
@@ -0,0 +1,48 @@
+import os
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: без файловой блокировки, там запускаем один процесс
+    fcntl = None
+
+from app.core.assets import build_assets, load_manifest
+from app.core.config import settings
+from app.core.db import init_db
+from app.repositories.shards import MAIN_SHARD, shard_router
+
+# set by app.serve once the master process has done the work below
+STARTUP_DONE_ENV = "FOCUSFLIGHT_STARTUP_DONE"
+
+
+def run_startup_tasks() -> None:
+    """Schema migration + asset build, done by one process at a time.
+
+    Under `python -m app.serve` the master runs this before starting the workers,
+    which then only read the manifest. Workers of plain `uvicorn --workers N` each
+    run it, one at a time under a lock file next to the database, so the DDL never
+    races; they detect that they are workers (settings.multiprocess) and keep their
+    open-session registries in sync like app.serve workers. Without fcntl (Windows)
+    there is no lock: run a single process there.
+    """
+    if os.getenv(STARTUP_DONE_ENV) == "1":
+        load_manifest()
+        shard_router.mark_initialized(MAIN_SHARD)
+        return
+
+    if fcntl is None:
+        init_db()
+        build_assets()
+        shard_router.mark_initialized(MAIN_SHARD)
+        return
+
+    lock_path = Path(settings.db_path + ".startup.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            init_db()
+            build_assets()
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    shard_router.mark_initialized(MAIN_SHARD)
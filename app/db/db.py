@@ -4,6 +4,9 @@ from pathlib import Path
 from typing import Iterator
 from contextlib import contextmanager
 
+from app.core.config import settings
+from app.core.metrics import connection_factory
+
 # app/db/db.py -> project root is 2 levels up
 DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "focusflight.db"
 
@@ -11,7 +14,12 @@ def _db_path() -> Path:
     return Path(os.getenv("FOCUSFLIGHT_DB_PATH", str(DEFAULT_DB_PATH))).expanduser().resolve()
 
 def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(_db_path(), check_same_thread=False)
+    conn = sqlite3.connect(
+        _db_path(),
+        timeout=settings.sqlite_busy_timeout_ms / 1000,
+        check_same_thread=False,
+        factory=connection_factory("ife"),
+    )
     conn.row_factory = sqlite3.Row
     return conn
 
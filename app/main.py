@@ -1,8 +1,19 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
+from app.core.admission import AdmissionMiddleware
+from app.core.assets import ASSETS_URL, PrecompressedStaticFiles
 from app.core.config import settings
-from app.core.db import init_db
+from app.core.metrics import MetricsMiddleware, metrics
+from app.core.profiling import ProfilingMiddleware, install_profiling
+from app.core.startup import run_startup_tasks
+from app.repositories.sessions_repo import SessionsRepo
+from app.services.ife_compute import ComputeBusy, shutdown_pool, start_pool
 
 from app.api.routes_pages import router as pages_router
 from app.api.routes_sessions import router as sessions_router
@@ -10,18 +21,65 @@ from app.api.routes_stats import router as stats_router
 from app.api.routes_export import router as export_router
 from app.api.routes_ife import router as ife_router
 from app.api.routes_airports import router as airports_router
+from app.api.routes_live import router as live_router
+from app.api.routes_metrics import router as metrics_router
+from app.api.routes_admin import router as admin_router
 
 app = FastAPI(title=settings.app_title)
+log = logging.getLogger("focusflight.sweeper")
+
+_sessions = SessionsRepo()
+_sweeper: asyncio.Task | None = None
+
+async def _sweep_abandoned_sessions():
+    while True:
+        await asyncio.sleep(settings.session_sweep_interval_s)
+        try:
+            await run_in_threadpool(_sessions.close_abandoned, settings.session_abandon_grace_s)
+        except Exception:
+            # следующий проход попробует снова (busy, locked, ...)
+            log.exception("closing abandoned sessions failed")
 
 @app.on_event("startup")
-def on_startup():
-    init_db()
+async def on_startup():
+    global _sweeper
+    await run_in_threadpool(run_startup_tasks)
+    await run_in_threadpool(_sessions.load_open_sessions)
+    await run_in_threadpool(start_pool)
+    _sweeper = asyncio.create_task(_sweep_abandoned_sessions())
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    if _sweeper:
+        _sweeper.cancel()
+    shutdown_pool()
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+@app.exception_handler(ComputeBusy)
+async def on_compute_busy(request: Request, exc: ComputeBusy):
+    # пул IFE занят долгими расчётами: отказ как у admission, клиент повторит позже
+    return JSONResponse({"error": "overloaded"}, status_code=503, headers={"Retry-After": "1"})
+
+# build/assets appears during startup (run_startup_tasks), hence check_dir=False
+app.mount(ASSETS_URL, PrecompressedStaticFiles(directory=settings.assets_dir, check_dir=False), name="assets")
+app.mount("/static", StaticFiles(directory=settings.static_dir), name="static")
 
 app.include_router(pages_router)
 app.include_router(sessions_router)
 app.include_router(stats_router)
 app.include_router(export_router)
 app.include_router(ife_router)
-app.include_router(airports_router)
\ No newline at end of file
+app.include_router(airports_router)
+app.include_router(live_router)
+app.include_router(admin_router)
+
+# первым: профилирование и метрики оборачивают его и видят отказы 429/503
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware)
+
+if settings.sql_tracing_needed:
+    install_profiling(app)
+    app.add_middleware(ProfilingMiddleware)
+
+if metrics.enabled:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
\ No newline at end of file
@@ -0,0 +1,186 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Collection
+
+from app.core.db import DEFAULT_TENANT
+
+
+@dataclass
+class OpenSession:
+    id: int
+    subject: str
+    planned_minutes: int
+    started_at: str
+    tenant: str = DEFAULT_TENANT
+    distractions_count: int = 0
+    # checkpoint id -> row (id, idx, due_seconds, completed_at, note)
+    checkpoints: dict[int, dict[str, Any]] = field(default_factory=dict)
+    last_seen: float = field(default_factory=time.time)
+
+    def as_row(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "subject": self.subject,
+            "planned_minutes": self.planned_minutes,
+            "started_at": self.started_at,
+            "ended_at": None,
+            "distractions_count": self.distractions_count,
+        }
+
+
+# последняя активность сессии: старт, последнее отвлечение или закрытый чекпоинт.
+# Одно правило для реестра (load) и для sweeper'а по выгруженным шардам
+LAST_SEEN_SQL = """MAX(
+    s.started_at,
+    COALESCE((SELECT MAX(d.noted_at) FROM distractions d WHERE d.session_id = s.id), ''),
+    COALESCE((SELECT MAX(c.completed_at) FROM checkpoints c WHERE c.session_id = s.id), '')
+)"""
+
+
+def iso_to_epoch(iso: str) -> float:
+    try:
+        return datetime.fromisoformat(iso).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+class OpenSessionsRegistry:
+    """In-process view of one shard's sessions with ended_at IS NULL; SQLite stays the source of truth."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items: dict[int, OpenSession] = {}
+        self._cp_owner: dict[int, int] = {}
+        # last session_changes.seq applied (only consulted in multiprocess mode)
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def load(self, con: sqlite3.Connection, session_ids: Collection[int] | None = None) -> None:
+        # session_ids=None: полная перезагрузка; иначе перечитываем только эти сессии
+        # (открыты или изменены другим воркером); закрытые среди них выбрасываем
+        only = "" if session_ids is None else f" AND s.id IN ({','.join('?' * len(session_ids))})"
+        params = () if session_ids is None else tuple(session_ids)
+        sessions = con.execute(
+            "SELECT s.id, s.subject, s.planned_minutes, s.started_at, s.distractions_count, s.tenant, "
+            f"{LAST_SEEN_SQL} AS last_seen "
+            "FROM sessions s WHERE s.ended_at IS NULL" + only,
+            params,
+        ).fetchall()
+        cps = con.execute(
+            """
+            SELECT c.id, c.session_id, c.idx, c.due_seconds, c.completed_at, c.note
+            FROM checkpoints c JOIN sessions s ON s.id = c.session_id
+            WHERE s.ended_at IS NULL
+            """ + only,
+            params,
+        ).fetchall()
+
+        items: dict[int, OpenSession] = {}
+        for r in sessions:
+            sid = int(r["id"])
+            items[sid] = OpenSession(
+                id=sid,
+                subject=r["subject"],
+                planned_minutes=int(r["planned_minutes"]),
+                started_at=r["started_at"],
+                tenant=r["tenant"],
+                distractions_count=int(r["distractions_count"] or 0),
+                last_seen=iso_to_epoch(r["last_seen"]),
+            )
+
+        owners: dict[int, int] = {}
+        for r in cps:
+            s = items.get(int(r["session_id"]))
+            if s is None:
+                continue
+            row = {k: r[k] for k in ("id", "idx", "due_seconds", "completed_at", "note")}
+            s.checkpoints[int(r["id"])] = row
+            owners[int(r["id"])] = s.id
+
+        with self._lock:
+            if session_ids is None:
+                self._items = items
+                self._cp_owner = owners
+                return
+            for sid in session_ids:
+                if sid not in items:
+                    self._pop(sid)
+            self._items.update(items)
+            self._cp_owner.update(owners)
+
+    def saw_version(self, version: int) -> None:
+        # своя запись в журнале: если между ней и прошлой версией никто не писал, кэш по-прежнему актуален
+        with self._lock:
+            if version == self.version + 1:
+                self.version = version
+
+    def add(self, session: OpenSession) -> None:
+        with self._lock:
+            self._items[session.id] = session
+
+    def get(self, session_id: int) -> OpenSession | None:
+        return self._items.get(session_id)
+
+    def touch(self, session_id: int) -> OpenSession | None:
+        s = self._items.get(session_id)
+        if s is not None:
+            s.last_seen = time.time()
+        return s
+
+    def set_checkpoints(self, session_id: int, rows: list[dict[str, Any]]) -> None:
+        with self._lock:
+            s = self._items.get(session_id)
+            if s is None:
+                return
+            s.checkpoints = {int(r["id"]): dict(r) for r in rows}
+            for cid in s.checkpoints:
+                self._cp_owner[cid] = session_id
+
+    def checkpoint(self, checkpoint_id: int) -> tuple[OpenSession, dict[str, Any]] | None:
+        sid = self._cp_owner.get(checkpoint_id)
+        s = self._items.get(sid) if sid is not None else None
+        if s is None:
+            return None
+        return s, s.checkpoints[checkpoint_id]
+
+    def add_distractions(self, session_id: int, n: int = 1) -> None:
+        with self._lock:
+            s = self._items.get(session_id)
+            if s is not None:
+                s.distractions_count += n
+                s.last_seen = time.time()
+
+    def complete_checkpoint(self, checkpoint_id: int, completed_at: str, note: str | None) -> None:
+        with self._lock:
+            found = self.checkpoint(checkpoint_id)
+            if found is None:
+                return
+            s, cp = found
+            cp["completed_at"] = completed_at
+            cp["note"] = note
+            s.last_seen = time.time()
+
+    def pop(self, session_id: int) -> OpenSession | None:
+        with self._lock:
+            return self._pop(session_id)
+
+    def _pop(self, session_id: int) -> OpenSession | None:
+        s = self._items.pop(session_id, None)
+        if s is not None:
+            for cid in s.checkpoints:
+                self._cp_owner.pop(cid, None)
+        return s
+
+    def abandoned(self, grace_seconds: float, now: float | None = None) -> list[OpenSession]:
+        # брошенный полёт: нет активности дольше плана + запас
+        now = time.time() if now is None else now
+        return [
+            s for s in list(self._items.values())
+            if now - s.last_seen > s.planned_minutes * 60 + grace_seconds
+        ]
+
@@ -1,22 +1,77 @@
+import os
+import time
 from typing import Any
-from app.core.db import connect
+from app.core.config import settings
+from app.core.db import DEFAULT_TENANT, log_session_change, retry_busy
 from app.core.utils import utc_now_iso
+from app.repositories.open_sessions import LAST_SEEN_SQL, OpenSession, iso_to_epoch
+from app.repositories.shards import MAIN_SHARD, Shard, shard_names, shard_router
 
 class SessionsRepo:
+    # one tenant's view: every call goes to the shard the router assigns to self.tenant.
+    # open sessions are validated against the shard's in-memory registry; SQLite only sees the writes.
+    # The registry is a cache: in multiprocess mode the sessions other processes logged in
+    # session_changes are re-read one by one, and a miss is filled from the shard by primary key.
+
+    def __init__(self, tenant: str = DEFAULT_TENANT):
+        self.tenant = tenant
+
+    def for_tenant(self, tenant: str) -> "SessionsRepo":
+        return self if tenant == self.tenant else SessionsRepo(tenant)
+
+    @property
+    def shard(self) -> Shard | None:
+        # None: тенант ещё не начинал сессий; чтения отдают пустое и ничего не создают
+        return shard_router.for_tenant(self.tenant)
+
+    def load_open_sessions(self) -> int:
+        return shard_router.shard(MAIN_SHARD).load_open_sessions()
+
+    def _sync(self, shard: Shard) -> None:
+        if settings.multiprocess:
+            shard.sync()
+
+    def _open(self, shard: Shard, session_id: int) -> OpenSession | None:
+        self._sync(shard)
+        s = shard.open_sessions.get(session_id)
+        if s is None:
+            # промах: сессию мог открыть другой процесс (в т.ч. uvicorn --workers без app.serve)
+            # или реестр шарда загружен до неё; одна выборка по первичному ключу
+            con = shard.connect()
+            shard.open_sessions.load(con, [session_id])
+            con.close()
+            s = shard.open_sessions.get(session_id)
+        # в одном шарде живут несколько тенантов: чужая сессия = нет сессии
+        return s if s is not None and s.tenant == self.tenant else None
+
+    @retry_busy
     def create_session(self, subject: str, planned_minutes: int) -> int:
-        con = connect()
+        started_at = utc_now_iso()
+        shard = shard_router.for_tenant(self.tenant, create=True)
+        con = shard.connect()
         cur = con.cursor()
         cur.execute(
-            "INSERT INTO sessions(subject, planned_minutes, started_at) VALUES(?,?,?)",
-            (subject, planned_minutes, utc_now_iso())
+            "INSERT INTO sessions(subject, planned_minutes, started_at, tenant) VALUES(?,?,?,?)",
+            (subject, planned_minutes, started_at, self.tenant)
         )
         sid = cur.lastrowid
         con.commit()
         con.close()
+
+        shard.open_sessions.add(OpenSession(
+            id=int(sid), subject=subject, planned_minutes=planned_minutes, started_at=started_at,
+            tenant=self.tenant,
+        ))
         return int(sid)
 
+    @retry_busy
     def ensure_checkpoints(self, session_id: int, planned_minutes: int) -> None:
-        con = connect()
+        shard = self.shard
+        s = self._open(shard, session_id) if shard is not None else None
+        if s is None or s.checkpoints:
+            return
+
+        con = shard.connect()
         cur = con.cursor()
 
         exists = cur.execute(
@@ -31,70 +86,191 @@ class SessionsRepo:
         idx = 1
         due = 10 * 60
         now = utc_now_iso()
+        rows = []
         while due < total_seconds + 1:
             cur.execute(
                 "INSERT INTO checkpoints(session_id, idx, due_seconds, created_at) VALUES(?,?,?,?)",
                 (session_id, idx, due, now)
             )
+            rows.append({"id": cur.lastrowid, "idx": idx, "due_seconds": due, "completed_at": None, "note": None})
             idx += 1
             due += 10 * 60
 
+        version = log_session_change(cur, session_id)
         con.commit()
         con.close()
+        shard.open_sessions.set_checkpoints(session_id, rows)
+        shard.open_sessions.saw_version(version)
 
+    @retry_busy
     def add_distraction(self, session_id: int, note: str | None) -> None:
-        con = connect()
-        cur = con.cursor()
-
-        row = cur.execute("SELECT ended_at FROM sessions WHERE id = ?", (session_id,)).fetchone()
-        if not row or row["ended_at"] is not None:
-            con.close()
+        shard = self.shard
+        if shard is None or self._open(shard, session_id) is None:
             raise ValueError("invalid session")
 
-        cur.execute(
+        con = shard.connect()
+        con.execute(
             "INSERT INTO distractions(session_id, noted_at, note) VALUES(?,?,?)",
             (session_id, utc_now_iso(), note)
         )
+        con.execute(
+            "UPDATE sessions SET distractions_count = distractions_count + 1 WHERE id = ?",
+            (session_id,)
+        )
+        version = log_session_change(con.cursor(), session_id)
         con.commit()
         con.close()
+        shard.open_sessions.add_distractions(session_id)
+        shard.open_sessions.saw_version(version)
 
     def get_open_session(self, session_id: int) -> dict[str, Any] | None:
-        con = connect()
+        shard = self.shard
+        s = self._open(shard, session_id) if shard is not None else None
+        if s is None:
+            return None
+        shard.open_sessions.touch(session_id)
+        return s.as_row()
+
+    def list_checkpoints(self, session_id: int) -> list[dict[str, Any]]:
+        shard = self.shard
+        if shard is None:
+            return []
+        s = self._open(shard, session_id)
+        if s is not None:
+            return sorted((dict(c) for c in s.checkpoints.values()), key=lambda c: c["idx"])
+
+        con = shard.connect()
         cur = con.cursor()
         row = cur.execute(
-            "SELECT * FROM sessions WHERE id = ? AND ended_at IS NULL",
-            (session_id,)
+            "SELECT archived_month FROM sessions WHERE id = ? AND tenant = ?", (session_id, self.tenant)
         ).fetchone()
         con.close()
-        return dict(row) if row else None
+        if row is None:
+            return []
 
-    def list_checkpoints(self, session_id: int) -> list[dict[str, Any]]:
-        con = connect()
-        cur = con.cursor()
-        rows = cur.execute(
-            "SELECT id, idx, due_seconds, completed_at, note FROM checkpoints WHERE session_id = ? ORDER BY idx",
-            (session_id,)
-        ).fetchall()
+        # после архивации чекпоинты лежат в месячном архиве шарда
+        schema = "main" if row["archived_month"] is None else "arch"
+        return self._read(
+            shard,
+            row["archived_month"],
+            f"SELECT id, idx, due_seconds, completed_at, note FROM {schema}.checkpoints WHERE session_id = ? ORDER BY idx",
+            (session_id,),
+        )
+
+    def _read(self, shard: Shard, month: str | None, sql: str, params: tuple) -> list[dict[str, Any]]:
+        # month: archive of that month attached as "arch"; None = hot tables only
+        con = shard.connect()
+        if month is not None:
+            path = shard.archive_path(month)
+            if not os.path.exists(path):
+                con.close()
+                return []
+            con.execute("ATTACH DATABASE ? AS arch", (path,))
+        rows = con.execute(sql, params).fetchall()
         con.close()
         return [dict(r) for r in rows]
 
+    @retry_busy
     def complete_checkpoint(self, checkpoint_id: int, note: str | None) -> None:
-        con = connect()
-        cur = con.cursor()
-        row = cur.execute("SELECT completed_at FROM checkpoints WHERE id = ?", (checkpoint_id,)).fetchone()
-        if not row:
-            con.close()
+        shard = self.shard
+        if shard is None:
             raise ValueError("not found")
-        if row["completed_at"] is not None:
-            con.close()
+        self._sync(shard)
+        found = shard.open_sessions.checkpoint(checkpoint_id)
+        if found is not None and found[0].tenant != self.tenant:
+            raise ValueError("not found")
+        if found is not None and found[1]["completed_at"] is not None:
             return
 
+        con = shard.connect()
+        cur = con.cursor()
+        if found is None:
+            # чекпоинт закрытой сессии (или не загруженной в реестр): проверяем по базе
+            row = cur.execute(
+                """
+                SELECT c.session_id, c.completed_at FROM checkpoints c JOIN sessions s ON s.id = c.session_id
+                WHERE c.id = ? AND s.tenant = ?
+                """,
+                (checkpoint_id, self.tenant)
+            ).fetchone()
+            if not row:
+                con.close()
+                raise ValueError("not found")
+            if row["completed_at"] is not None:
+                con.close()
+                return
+            session_id = int(row["session_id"])
+        else:
+            session_id = found[0].id
+
+        completed_at = utc_now_iso()
         cur.execute(
             "UPDATE checkpoints SET completed_at = ?, note = ? WHERE id = ?",
-            (utc_now_iso(), note, checkpoint_id)
+            (completed_at, note, checkpoint_id)
         )
+        version = log_session_change(cur, session_id)
         con.commit()
         con.close()
+        shard.open_sessions.complete_checkpoint(checkpoint_id, completed_at, note)
+        shard.open_sessions.saw_version(version)
+
+    @retry_busy
+    def apply_events(self, session_id: int, events: list[dict[str, Any]]) -> list[str | None]:
+        # live channel: one connection + one transaction per batch, per-event error (None = ok)
+        shard = self.shard
+        s = self._open(shard, session_id) if shard is not None else None
+        if s is None:
+            return ["invalid session"] * len(events)
+
+        con = shard.connect()
+        cur = con.cursor()
+
+        results: list[str | None] = []
+        distractions = 0
+        completed: list[tuple[int, str, str | None]] = []
+        for ev in events:
+            kind = ev.get("type")
+            note = ev.get("note")
+            if kind == "distraction":
+                cur.execute(
+                    "INSERT INTO distractions(session_id, noted_at, note) VALUES(?,?,?)",
+                    (session_id, utc_now_iso(), note)
+                )
+                distractions += 1
+                results.append(None)
+            elif kind == "checkpoint":
+                cid = ev.get("checkpoint_id")
+                cp = s.checkpoints.get(cid)
+                if cp is None:
+                    results.append("not found")
+                    continue
+                if cp["completed_at"] is None and all(c[0] != cid for c in completed):
+                    completed_at = utc_now_iso()
+                    cur.execute(
+                        "UPDATE checkpoints SET completed_at = ?, note = ? WHERE id = ?",
+                        (completed_at, note, cid)
+                    )
+                    completed.append((cid, completed_at, note))
+                results.append(None)
+            else:
+                results.append("bad event")
+
+        if distractions:
+            cur.execute(
+                "UPDATE sessions SET distractions_count = distractions_count + ? WHERE id = ?",
+                (distractions, session_id)
+            )
+        version = log_session_change(cur, session_id) if distractions or completed else None
+        con.commit()
+        con.close()
+
+        if distractions:
+            shard.open_sessions.add_distractions(session_id, distractions)
+        for cid, completed_at, note in completed:
+            shard.open_sessions.complete_checkpoint(cid, completed_at, note)
+        if version is not None:
+            shard.open_sessions.saw_version(version)
+        return results
 
     def end_session(
         self,
@@ -102,44 +278,95 @@ class SessionsRepo:
         actual_seconds: int,
         altitude_end: int,
         turbulence_end: int,
-        grade: str
+        grade: str | None
     ) -> None:
-        con = connect()
-        cur = con.cursor()
-
-        dcount = cur.execute(
-            "SELECT COUNT(*) AS c FROM distractions WHERE session_id = ?",
-            (session_id,)
-        ).fetchone()["c"]
+        shard = self.shard
+        if shard is None or self._open(shard, session_id) is None:
+            raise ValueError("invalid session")
+        self._end(shard, session_id, actual_seconds, altitude_end, turbulence_end, grade)
 
+    @staticmethod
+    @retry_busy
+    def _end(
+        shard: Shard,
+        session_id: int,
+        actual_seconds: int,
+        altitude_end: int,
+        turbulence_end: int,
+        grade: str | None
+    ) -> None:
+        # distractions_count is kept up to date by add_distraction / apply_events
+        con = shard.connect()
+        cur = con.cursor()
         cur.execute(
             """
             UPDATE sessions
             SET ended_at = ?, actual_seconds = ?,
-                distractions_count = ?, altitude_end = ?, turbulence_end = ?, grade = ?
+                altitude_end = ?, turbulence_end = ?, grade = ?
             WHERE id = ? AND ended_at IS NULL
             """,
-            (utc_now_iso(), actual_seconds, int(dcount), altitude_end, turbulence_end, grade, session_id)
+            (utc_now_iso(), actual_seconds, altitude_end, turbulence_end, grade, session_id)
         )
+        ended = cur.rowcount
+        version = log_session_change(cur, session_id)
         con.commit()
         con.close()
+        shard.open_sessions.pop(session_id)
+        shard.open_sessions.saw_version(version)
+        if not ended:
+            # реестр отстал: сессию уже закрыл другой процесс
+            raise ValueError("invalid session")
+
+    def close_abandoned(self, grace_seconds: float) -> int:
+        # все шарды, не только свой: sweeper один на процесс. Открытые — по реестру,
+        # вытесненные — запросом к файлу, не затягивая их обратно в роутер
+        resident = {shard.name: shard for shard in shard_router.resident()}
+        closed = 0
+        for name in shard_names():
+            shard = resident.get(name)
+            if shard is not None:
+                stale = [s.id for s in shard.open_sessions.abandoned(grace_seconds)]
+            else:
+                shard = Shard(name)
+                if not os.path.exists(shard.path):
+                    continue
+                stale = _abandoned_in_db(shard, grace_seconds)
+                if stale:
+                    # файл мог остаться от версии без session_changes
+                    shard.init_schema()
+            for session_id in stale:
+                # без оценки: пользователь так и не приземлился
+                try:
+                    self._end(shard, session_id, 0, 100, 0, None)
+                    closed += 1
+                except ValueError:
+                    pass
+            if name in resident:
+                shard.prune_changes()
+            else:
+                shard.close()
+        return closed
 
     def today_stats(self) -> dict[str, int]:
         from datetime import date
         today = date.today().isoformat()
+        shard = self.shard
+        if shard is None:
+            return {"date": today, "sessions": 0, "focus_minutes": 0, "distractions": 0}
 
-        con = connect()
+        con = shard.connect()
         cur = con.cursor()
 
         s = cur.execute(
             "SELECT COUNT(*) AS c, COALESCE(SUM(actual_seconds),0) AS sum_s "
-            "FROM sessions WHERE started_at LIKE ? AND ended_at IS NOT NULL",
-            (today + "%",)
+            "FROM sessions WHERE tenant = ? AND started_at LIKE ? AND ended_at IS NOT NULL",
+            (self.tenant, today + "%")
         ).fetchone()
 
         d = cur.execute(
-            "SELECT COUNT(*) AS c FROM distractions WHERE noted_at LIKE ?",
-            (today + "%",)
+            "SELECT COUNT(*) AS c FROM distractions d JOIN sessions s ON s.id = d.session_id "
+            "WHERE s.tenant = ? AND d.noted_at LIKE ?",
+            (self.tenant, today + "%")
         ).fetchone()
 
         con.close()
@@ -153,33 +380,155 @@ class SessionsRepo:
         }
 
     def recent_sessions(self, limit: int = 10) -> list[dict[str, Any]]:
-        con = connect()
+        shard = self.shard
+        if shard is None:
+            return []
+        con = shard.connect()
         cur = con.cursor()
         rows = cur.execute(
             """
             SELECT id, subject, planned_minutes, started_at, ended_at, actual_seconds,
                    distractions_count, altitude_end, turbulence_end, grade
             FROM sessions
-            WHERE ended_at IS NOT NULL
+            WHERE tenant = ? AND ended_at IS NOT NULL
             ORDER BY id DESC
             LIMIT ?
             """,
-            (limit,)
+            (self.tenant, limit)
         ).fetchall()
         con.close()
         return [dict(r) for r in rows]
 
+    def _id_bound(self, cur, op: str, started_at: str) -> int | None:
+        # Допущение: в пределах тенанта id растёт вместе со started_at — id выдаётся при старте
+        # сессии, а rebalance переносит тенанта по порядку id. Тогда диапазон дат сводится к
+        # диапазону id. Если часы сервера пойдут назад, сессия вне диапазона id может выпасть
+        # из фильтра; лишних строк не будет — started_at проверяется ещё и в самой выборке
+        order = "ASC" if op == ">=" else "DESC"
+        row = cur.execute(
+            f"SELECT id FROM sessions WHERE tenant = ? AND started_at {op} ? ORDER BY started_at {order} LIMIT 1",
+            (self.tenant, started_at)
+        ).fetchone()
+        return None if row is None else int(row["id"])
+
+    def history_page(
+        self,
+        before_id: int | None = None,
+        limit: int = 20,
+        subject: str | None = None,
+        grade: str | None = None,
+        started_from: str | None = None,
+        started_before: str | None = None,
+    ) -> list[dict[str, Any]]:
+        shard = self.shard
+        if shard is None:
+            return []
+        con = shard.connect()
+        cur = con.cursor()
+
+        where = ["tenant = ?", "ended_at IS NOT NULL"]
+        params: list[Any] = [self.tenant]
+
+        if subject is not None:
+            where.append("subject = ?")
+            params.append(subject)
+        if grade is not None:
+            where.append("grade = ?")
+            params.append(grade)
+        if before_id is not None:
+            where.append("id < ?")
+            params.append(before_id)
+        if started_from is not None:
+            lo = self._id_bound(cur, ">=", started_from)
+            if lo is None:
+                con.close()
+                return []
+            where += ["id >= ?", "started_at >= ?"]
+            params += [lo, started_from]
+        if started_before is not None:
+            hi = self._id_bound(cur, "<", started_before)
+            if hi is None:
+                con.close()
+                return []
+            where += ["id <= ?", "started_at < ?"]
+            params += [hi, started_before]
+
+        # при обоих фильтрах хватает индекса по subject, grade в нём покрыт
+        # (как и started_at: проверка дат внутри диапазона id не ходит в таблицу)
+        index = "INDEXED BY idx_sessions_tenant_history"
+        if subject is not None:
+            index = "INDEXED BY idx_sessions_tenant_subject"
+        elif grade is not None:
+            index = "INDEXED BY idx_sessions_tenant_grade"
+
+        rows = cur.execute(
+            f"""
+            SELECT id, subject, planned_minutes, started_at, ended_at, actual_seconds,
+                   distractions_count, altitude_end, turbulence_end, grade
+            FROM sessions {index}
+            WHERE {" AND ".join(where)}
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (*params, limit)
+        ).fetchall()
+        con.close()
+        return [dict(r) for r in rows]
+
+    def list_distractions_for_export(self) -> list[dict[str, Any]]:
+        # горячие строки + все архивные месяцы тенанта
+        shard = self.shard
+        if shard is None:
+            return []
+        con = shard.connect()
+        months = [
+            r["archived_month"] for r in con.execute(
+                "SELECT DISTINCT archived_month FROM sessions WHERE tenant = ? AND archived_month IS NOT NULL",
+                (self.tenant,)
+            ).fetchall()
+        ]
+        con.close()
+
+        sql = """
+            SELECT d.session_id, s.subject, s.started_at, d.noted_at, d.note
+            FROM {schema}.distractions d JOIN main.sessions s ON s.id = d.session_id
+            WHERE s.tenant = ?
+        """
+        rows = self._read(shard, None, sql.format(schema="main"), (self.tenant,))
+        for month in months:
+            rows += self._read(shard, month, sql.format(schema="arch"), (self.tenant,))
+        rows.sort(key=lambda r: (-r["session_id"], r["noted_at"]))
+        return rows
+
     def list_sessions_for_export(self) -> list[dict[str, Any]]:
-        con = connect()
+        shard = self.shard
+        if shard is None:
+            return []
+        con = shard.connect()
         cur = con.cursor()
         rows = cur.execute(
             """
             SELECT id, subject, planned_minutes, started_at, ended_at, actual_seconds,
                    distractions_count, altitude_end, turbulence_end, grade
             FROM sessions
-            WHERE ended_at IS NOT NULL
+            WHERE tenant = ? AND ended_at IS NOT NULL
             ORDER BY id DESC
-            """
+            """,
+            (self.tenant,)
         ).fetchall()
         con.close()
         return [dict(r) for r in rows]
+
+
+def _abandoned_in_db(shard: Shard, grace_seconds: float, now: float | None = None) -> list[int]:
+    # то же правило, что OpenSessionsRegistry.abandoned, но последняя активность берётся из базы
+    now = time.time() if now is None else now
+    con = shard.connect()
+    rows = con.execute(
+        f"SELECT s.id, s.planned_minutes, {LAST_SEEN_SQL} AS last_seen FROM sessions s WHERE s.ended_at IS NULL"
+    ).fetchall()
+    con.close()
+    return [
+        int(r["id"]) for r in rows
+        if now - iso_to_epoch(r["last_seen"]) > int(r["planned_minutes"]) * 60 + grace_seconds
+    ]
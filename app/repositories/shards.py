@@ -0,0 +1,234 @@
+import hashlib
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.db import DEFAULT_TENANT, connect, init_sessions_schema, read_change_seq
+from app.core.metrics import metrics
+from app.repositories.open_sessions import OpenSessionsRegistry
+
+MAIN_SHARD = "main"
+
+# имя тенанта попадает в имя файла (shard_mode=tenant), поэтому без точек и слэшей
+_TENANT_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def valid_tenant(tenant: str) -> bool:
+    return bool(_TENANT_RE.match(tenant))
+
+
+def placement(tenant: str, mode: str | None = None, count: int | None = None) -> str:
+    """Shard a new tenant lands on. The default tenant stays in the main DB with the legacy rows."""
+    mode = mode or settings.shard_mode
+    if mode == "off" or tenant == DEFAULT_TENANT:
+        return MAIN_SHARD
+    if mode == "tenant":
+        return f"tenant-{tenant}"
+    count = max(1, count or settings.shard_count)
+    h = int.from_bytes(hashlib.blake2b(tenant.encode(), digest_size=8).digest(), "big")
+    return f"shard-{h % count:03d}"
+
+
+def shard_path(name: str) -> str:
+    if name == MAIN_SHARD:
+        return settings.db_path
+    return str(Path(settings.shard_dir) / f"{name}.db")
+
+
+def shard_names() -> list[str]:
+    """Every shard that has tenants in the directory, plus main."""
+    con = connect()
+    rows = con.execute("SELECT DISTINCT shard FROM tenant_shards").fetchall()
+    con.close()
+    return sorted({MAIN_SHARD, *(r["shard"] for r in rows)})
+
+
+class Shard:
+    """One SQLite file: its open-session registry plus a persistent handle for change-log checks."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.path = shard_path(name)
+        self.open_sessions = OpenSessionsRegistry()
+        self._lock = threading.Lock()
+        self._version_con: sqlite3.Connection | None = None
+        self._sync_lock = threading.Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        return connect(self.path)
+
+    def archive_path(self, month: str) -> str:
+        # month = "YYYY-MM" of the sessions' started_at
+        return str(Path(settings.archive_dir) / self.name / f"{month}.db")
+
+    def init_schema(self) -> None:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        con = self.connect()
+        init_sessions_schema(con.cursor())
+        con.commit()
+        con.close()
+
+    def load_open_sessions(self) -> int:
+        con = self.connect()
+        version = read_change_seq(con)
+        self.open_sessions.load(con)
+        self.open_sessions.version = version
+        con.close()
+        return len(self.open_sessions)
+
+    def version(self) -> int:
+        with self._lock:
+            if self._version_con is None:
+                self._version_con = sqlite3.connect(
+                    self.path, timeout=settings.sqlite_busy_timeout_ms / 1000, check_same_thread=False
+                )
+            return read_change_seq(self._version_con)
+
+    def sync(self) -> None:
+        """Re-read only the sessions other processes changed since the registry's version."""
+        if self.version() == self.open_sessions.version:
+            return
+        with self._sync_lock:
+            seen = self.open_sessions.version
+            con = self.connect()
+            rows = con.execute(
+                "SELECT seq, session_id FROM session_changes WHERE seq > ? ORDER BY seq", (seen,)
+            ).fetchall()
+            if not rows:
+                con.close()
+                return
+            if rows[0]["seq"] != seen + 1:
+                # журнал почищен дальше, чем мы успели прочитать: полная перезагрузка
+                con.close()
+                self.load_open_sessions()
+                return
+            ids = list({int(r["session_id"]) for r in rows})
+            for i in range(0, len(ids), 500):
+                self.open_sessions.load(con, ids[i:i + 500])
+            con.close()
+            self.open_sessions.version = max(self.open_sessions.version, int(rows[-1]["seq"]))
+
+    def prune_changes(self) -> None:
+        # хвост журнала нужен только отставшим воркерам; кто отстал сильнее — перезагрузится целиком
+        con = self.connect()
+        con.execute(
+            "DELETE FROM session_changes WHERE seq <= (SELECT MAX(seq) FROM session_changes) - ?",
+            (settings.session_changes_keep,),
+        )
+        con.commit()
+        con.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._version_con is not None:
+                self._version_con.close()
+                self._version_con = None
+
+
+class ShardRouter:
+    """tenant -> shard name (tenant_shards in the main DB) -> Shard, at most `capacity` kept open."""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._lock = threading.Lock()
+        self._directory: dict[str, str] = {}
+        self._shards: OrderedDict[str, Shard] = OrderedDict()
+        self._initialized: set[str] = set()
+        # name -> lock of the thread currently opening that shard
+        self._opening: dict[str, threading.Lock] = {}
+
+    def shard_name(self, tenant: str, create: bool = False) -> str | None:
+        """Shard recorded for the tenant. Placement is recorded only with create=True (session start);
+        otherwise an unknown tenant gives None, so reads never write the directory or create files."""
+        name = self._directory.get(tenant)
+        if name is not None:
+            return name
+
+        # первая сессия тенанта: фиксируем размещение, чтобы смена конфигурации
+        # не переносила уже существующих тенантов (это делает только rebalance)
+        con = connect()
+        if create:
+            con.execute(
+                "INSERT OR IGNORE INTO tenant_shards(tenant, shard) VALUES (?, ?)",
+                (tenant, placement(tenant))
+            )
+            con.commit()
+        row = con.execute("SELECT shard FROM tenant_shards WHERE tenant = ?", (tenant,)).fetchone()
+        con.close()
+        if row is None:
+            if tenant != DEFAULT_TENANT:
+                return None
+            # строки до появления тенантов: default всегда в main, запись не нужна
+            name = MAIN_SHARD
+        else:
+            name = row["shard"]
+        self._directory[tenant] = name
+        return name
+
+    def for_tenant(self, tenant: str, create: bool = False) -> Shard | None:
+        name = self.shard_name(tenant, create)
+        return None if name is None else self.shard(name)
+
+    def mark_initialized(self, name: str) -> None:
+        # схему уже создал init_db (startup): не повторять DDL при первом открытии
+        with self._lock:
+            self._initialized.add(name)
+
+    def shard(self, name: str) -> Shard:
+        with self._lock:
+            shard = self._shards.get(name)
+            if shard is not None:
+                self._shards.move_to_end(name)
+                return shard
+            opening = self._opening.setdefault(name, threading.Lock())
+
+        # создание файла, DDL и загрузка реестра — без общего замка, чтобы медленный шард
+        # не останавливал запросы к уже открытым; один и тот же шард открывает один поток
+        with opening:
+            with self._lock:
+                shard = self._shards.get(name)
+                if shard is not None:
+                    self._shards.move_to_end(name)
+                    return shard
+                needs_schema = name not in self._initialized
+
+            shard = Shard(name)
+            if needs_schema:
+                shard.init_schema()
+            shard.load_open_sessions()
+
+            with self._lock:
+                self._initialized.add(name)
+                self._shards[name] = shard
+                self._opening.pop(name, None)
+                # main не вытесняем: там сессии по умолчанию и их подметает sweeper
+                while len(self._shards) > self.capacity:
+                    victim = next((n for n in self._shards if n != MAIN_SHARD and n != name), None)
+                    if victim is None:
+                        break
+                    self._shards.pop(victim).close()
+            return shard
+
+    def resident(self) -> list[Shard]:
+        with self._lock:
+            return list(self._shards.values())
+
+    def forget(self) -> None:
+        # после rebalance в этом процессе (tools): справочник и хэндлы устарели
+        with self._lock:
+            for shard in self._shards.values():
+                shard.close()
+            self._shards.clear()
+            self._directory.clear()
+
+
+shard_router = ShardRouter(settings.shard_handles)
+metrics.gauge("focusflight_shards_open", "Shard handles held by the router.", lambda: len(shard_router.resident()))
+metrics.gauge(
+    "focusflight_open_sessions",
+    "Sessions held in the open-session registries of open shards.",
+    lambda: sum(len(s.open_sessions) for s in shard_router.resident()),
+)
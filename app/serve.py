@@ -0,0 +1,36 @@
+"""Multi-worker entry point: one SQLite file, N uvicorn worker processes.
+
+    python -m app.serve --workers 4 --host 0.0.0.0 --port 8000
+
+The master runs startup (schema + assets) once, then uvicorn forks the workers.
+Each worker keeps its own open-sessions registry and re-reads from the
+session_changes log only the sessions other workers have written to.
+"""
+import argparse
+import os
+
+import uvicorn
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--log-level", default="info")
+    args = ap.parse_args()
+
+    # до импорта app.*: Settings читает окружение при импорте
+    os.environ["FOCUSFLIGHT_MULTIPROCESS"] = "1"
+
+    from app.core.startup import STARTUP_DONE_ENV, run_startup_tasks
+
+    run_startup_tasks()
+    os.environ[STARTUP_DONE_ENV] = "1"
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,243 @@
+import json
+import math
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.core.db import retry_busy
+from app.core.metrics import metrics
+from app.repositories.shards import Shard, shard_names
+
+archived_sessions = metrics.counter(
+    "focusflight_archived_sessions_total", "Sessions whose raw events were moved to an archive file."
+)
+
+
+def _init_archive(path: str) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path, timeout=settings.sqlite_busy_timeout_ms / 1000)
+    # id те же, что были в горячей базе: повторный прогон после сбоя ничего не задвоит
+    con.executescript("""
+    CREATE TABLE IF NOT EXISTS distractions (
+        id INTEGER PRIMARY KEY,
+        session_id INTEGER NOT NULL,
+        noted_at TEXT NOT NULL,
+        note TEXT
+    );
+    CREATE TABLE IF NOT EXISTS checkpoints (
+        id INTEGER PRIMARY KEY,
+        session_id INTEGER NOT NULL,
+        idx INTEGER NOT NULL,
+        due_seconds INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        completed_at TEXT,
+        note TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_distractions_session ON distractions(session_id);
+    CREATE INDEX IF NOT EXISTS idx_checkpoints_session ON checkpoints(session_id);
+    """)
+    con.close()
+
+
+def _histogram(started_at: str, actual_seconds: int, noted: list[str]) -> list[int]:
+    bucket = settings.distraction_histogram_bucket_s
+    start = datetime.fromisoformat(started_at)
+    offsets = [max(0.0, (datetime.fromisoformat(n) - start).total_seconds()) for n in noted]
+    size = max(1, math.ceil((actual_seconds or 0) / bucket), *(int(o // bucket) + 1 for o in offsets))
+    hist = [0] * size
+    for o in offsets:
+        hist[int(o // bucket)] += 1
+    return hist
+
+
+@retry_busy
+def _archive_month(shard: Shard, month: str, sessions: list[sqlite3.Row]) -> None:
+    path = shard.archive_path(month)
+    _init_archive(path)
+    ids = [int(r["id"]) for r in sessions]
+    marks = ",".join("?" * len(ids))
+
+    con = shard.connect()
+    con.execute("ATTACH DATABASE ? AS arch", (path,))
+    cur = con.cursor()
+
+    # 1) копия в архив, отдельной транзакцией: горячие строки удаляются только после неё
+    cur.execute(
+        f"INSERT OR IGNORE INTO arch.distractions SELECT id, session_id, noted_at, note "
+        f"FROM main.distractions WHERE session_id IN ({marks})",
+        ids
+    )
+    cur.execute(
+        f"INSERT OR IGNORE INTO arch.checkpoints SELECT id, session_id, idx, due_seconds, created_at, completed_at, note "
+        f"FROM main.checkpoints WHERE session_id IN ({marks})",
+        ids
+    )
+    con.commit()
+
+    # 2) сводка на строке сессии + удаление сырых строк
+    noted: dict[int, list[str]] = defaultdict(list)
+    for r in cur.execute(
+        f"SELECT session_id, noted_at FROM main.distractions WHERE session_id IN ({marks}) ORDER BY id", ids
+    ):
+        noted[int(r["session_id"])].append(r["noted_at"])
+    cps = {
+        int(r["session_id"]): (int(r["total"]), int(r["done"]))
+        for r in cur.execute(
+            f"""
+            SELECT session_id, COUNT(*) AS total, SUM(completed_at IS NOT NULL) AS done
+            FROM main.checkpoints WHERE session_id IN ({marks}) GROUP BY session_id
+            """,
+            ids
+        )
+    }
+    cur.executemany(
+        """
+        UPDATE main.sessions
+        SET checkpoints_total = ?, checkpoints_completed = ?, distraction_histogram = ?, archived_month = ?
+        WHERE id = ?
+        """,
+        [
+            (
+                *cps.get(int(r["id"]), (0, 0)),
+                json.dumps(_histogram(r["started_at"], r["actual_seconds"], noted.get(int(r["id"]), []))),
+                month,
+                int(r["id"]),
+            )
+            for r in sessions
+        ]
+    )
+    cur.execute(f"DELETE FROM main.distractions WHERE session_id IN ({marks})", ids)
+    cur.execute(f"DELETE FROM main.checkpoints WHERE session_id IN ({marks})", ids)
+    con.commit()
+    con.close()
+
+
+def archive_shard(shard: Shard, cutoff: str) -> dict[str, Any]:
+    """Archive ended sessions of one shard that ended before `cutoff`, batch by batch."""
+    n = 0
+    months: set[str] = set()
+    while True:
+        con = shard.connect()
+        rows = con.execute(
+            """
+            SELECT id, started_at, actual_seconds FROM sessions
+            WHERE archived_month IS NULL AND ended_at IS NOT NULL AND ended_at < ?
+            ORDER BY ended_at
+            LIMIT ?
+            """,
+            (cutoff, settings.archive_batch)
+        ).fetchall()
+        con.close()
+        if not rows:
+            break
+
+        by_month: dict[str, list[sqlite3.Row]] = defaultdict(list)
+        for r in rows:
+            by_month[r["started_at"][:7]].append(r)
+        for month, group in sorted(by_month.items()):
+            _archive_month(shard, month, group)
+            archived_sessions.inc(len(group))
+        n += len(rows)
+        months.update(by_month)
+    return {"sessions": n, "months": sorted(months)}
+
+
+def _file_bytes(path: str) -> int:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+@retry_busy
+def _vacuum_step(con: sqlite3.Connection, pages: int) -> None:
+    # через execute() sqlite3 делает один шаг = одна страница; executescript прогоняет все pages
+    con.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+
+
+def vacuum_shard(shard: Shard, convert: bool = False) -> bool:
+    """Release free pages; False if the file predates incremental auto-vacuum and was left as is.
+
+    convert=True turns such a file into auto_vacuum=INCREMENTAL with a full VACUUM, which holds
+    the write lock for the whole rewrite: offline only (tools/archive_sessions.py --convert).
+    """
+    con = shard.connect()
+    incremental = con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    if not incremental and convert:
+        con.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        con.execute("VACUUM")
+        incremental = True
+    elif incremental:
+        # порциями по archive_vacuum_pages, каждая своей короткой транзакцией: запись в шард
+        # ждёт не дольше одной порции. Не больше, чем было свободно на старте — новые
+        # освобождённые страницы подберёт следующий прогон
+        free = con.execute("PRAGMA freelist_count").fetchone()[0]
+        for _ in range(math.ceil(free / settings.archive_vacuum_pages)):
+            _vacuum_step(con, settings.archive_vacuum_pages)
+            time.sleep(settings.archive_vacuum_pause_ms / 1000)
+    con.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    con.close()
+    return incremental
+
+
+@retry_busy
+def restore_tenant(shard: Shard, tenant: str) -> int:
+    """Bring a tenant's archived events back into the hot tables (before moving it to another shard)."""
+    con = shard.connect()
+    months = [
+        r["archived_month"] for r in con.execute(
+            "SELECT DISTINCT archived_month FROM sessions WHERE tenant = ? AND archived_month IS NOT NULL",
+            (tenant,)
+        )
+    ]
+    for month in months:
+        path = shard.archive_path(month)
+        if os.path.exists(path):
+            con.execute("ATTACH DATABASE ? AS arch", (path,))
+            owned = "(SELECT id FROM main.sessions WHERE tenant = ? AND archived_month = ?)"
+            con.execute(
+                f"INSERT OR IGNORE INTO main.distractions(id, session_id, noted_at, note) "
+                f"SELECT id, session_id, noted_at, note FROM arch.distractions WHERE session_id IN {owned}",
+                (tenant, month)
+            )
+            con.execute(
+                f"INSERT OR IGNORE INTO main.checkpoints(id, session_id, idx, due_seconds, created_at, completed_at, note) "
+                f"SELECT id, session_id, idx, due_seconds, created_at, completed_at, note "
+                f"FROM arch.checkpoints WHERE session_id IN {owned}",
+                (tenant, month)
+            )
+            con.commit()
+            con.execute(f"DELETE FROM arch.distractions WHERE session_id IN {owned}", (tenant, month))
+            con.execute(f"DELETE FROM arch.checkpoints WHERE session_id IN {owned}", (tenant, month))
+            con.commit()
+            con.execute("DETACH DATABASE arch")
+        con.execute(
+            "UPDATE sessions SET archived_month = NULL WHERE tenant = ? AND archived_month = ?", (tenant, month)
+        )
+        con.commit()
+    con.close()
+    return len(months)
+
+
+def run_archive(
+    older_than_days: int | None = None, vacuum: bool = True, convert: bool = False
+) -> list[dict[str, Any]]:
+    days = settings.archive_after_days if older_than_days is None else older_than_days
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+    report = []
+    for name in shard_names():
+        shard = Shard(name)
+        if not os.path.exists(shard.path):
+            continue
+        before = _file_bytes(shard.path)
+        res = archive_shard(shard, cutoff)
+        # needs_convert: свободные страницы не вернуть без tools/archive_sessions.py --convert
+        needs_convert = vacuum and not vacuum_shard(shard, convert)
+        report.append({
+            "shard": name, **res, "bytes_before": before, "bytes_after": _file_bytes(shard.path),
+            "needs_convert": needs_convert,
+        })
+    return report
@@ -22,3 +22,17 @@ def export_sessions_csv(repo: SessionsRepo) -> str:
         ])
 
     return out.getvalue()
+
+def export_distractions_csv(repo: SessionsRepo) -> str:
+    # includes archived months (see app.services.archive)
+    rows = repo.list_distractions_for_export()
+
+    out = io.StringIO()
+    w = csv.writer(out)
+
+    w.writerow(["session_id", "subject", "session_started_at", "noted_at", "note"])
+
+    for r in rows:
+        w.writerow([r["session_id"], r["subject"], r["started_at"], r["noted_at"], r["note"]])
+
+    return out.getvalue()
@@ -0,0 +1,286 @@
+import concurrent.futures as cf
+import math
+import multiprocessing
+import os
+import signal
+import sqlite3
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from timezonefinder import TimezoneFinder
+
+from app.core.airports import AIRPORTS
+from app.core.config import settings
+from app.core.geo import estimate_duration_minutes, haversine_km
+from app.core.metrics import metrics
+from app.db.db import get_db
+
+# /pick смотрит не дальше стольких строк airports (как и раньше, без ORDER BY)
+PICK_SCAN_LIMIT = 4000
+
+offloaded = metrics.counter(
+    "focusflight_ife_compute_total",
+    "IFE computations by kind and where they ran: pool, local (pool off), timeout/broken (fell back in-process), "
+    "shed (still running in the pool after two timeouts, 503).",
+)
+
+
+class ComputeBusy(RuntimeError):
+    """The pool is still busy with this computation after the timeout; the request is shed (503)."""
+
+
+def airport_code_col(conn: sqlite3.Connection) -> str | None:
+    cols = {r["name"] for r in conn.execute("PRAGMA table_info(airports)").fetchall()}
+    # твоя схема: iata
+    if "iata" in cols:
+        return "iata"
+    # схема ourairports: iata_code
+    if "iata_code" in cols:
+        return "iata_code"
+    # схема ourairports: code (если iata отсутствует)
+    if "code" in cols:
+        return "code"
+    return None
+
+
+def airports_key(conn: sqlite3.Connection):
+    """Cheap fingerprint of the airports table: changes when rows are added or replaced."""
+    code_col = airport_code_col(conn)
+    if not code_col:
+        return None
+    row = conn.execute("SELECT COUNT(*), MAX(rowid) FROM airports").fetchone()
+    return (code_col, row[0], row[1])
+
+
+def score_item(code: str, name: str, q_up: str, q_lo: str, parts: list[str]) -> int:
+    code_u = (code or "").upper()
+    name_s = (name or "")
+    name_l = name_s.lower()
+
+    s = 0
+    if code_u == q_up:
+        s += 1000
+    elif code_u.startswith(q_up):
+        s += 700
+    elif q_up in code_u:
+        s += 350
+
+    if name_l.startswith(q_lo):
+        s += 320
+    elif q_lo in name_l:
+        s += 160
+
+    if parts and all(p in name_l for p in parts):
+        s += 140
+
+    return s
+
+
+def _load_pick_table(conn: sqlite3.Connection) -> tuple[list[str], list[float], list[float]]:
+    codes: list[str] = []
+    lats: list[float] = []
+    lons: list[float] = []
+    code_col = airport_code_col(conn)
+    if code_col:
+        for r in conn.execute(
+            f"""
+            SELECT {code_col} AS code, lat, lon
+            FROM airports
+            WHERE {code_col} IS NOT NULL AND TRIM({code_col}) != ''
+            LIMIT {PICK_SCAN_LIMIT}
+            """
+        ):
+            code = (r["code"] or "").upper().strip()
+            if code:
+                codes.append(code)
+                lats.append(float(r["lat"]))
+                lons.append(float(r["lon"]))
+    return codes, lats, lons
+
+
+class _GeoState:
+    """Per-process TimezoneFinder and /pick candidate arrays, loaded once and reused."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tf: TimezoneFinder | None = None
+        self._table: tuple[list[str], list[float], list[float]] | None = None
+        self._key = None
+        self._checked = 0.0
+
+    def tf(self) -> TimezoneFinder:
+        if self._tf is None:
+            with self._lock:
+                if self._tf is None:
+                    self._tf = TimezoneFinder()
+        return self._tf
+
+    def table(self) -> tuple[list[str], list[float], list[float]]:
+        now = time.monotonic()
+        if self._table is not None and now - self._checked < settings.airports_check_s:
+            return self._table
+        with self._lock:
+            if self._table is None or now - self._checked >= settings.airports_check_s:
+                conn = get_db()
+                try:
+                    key = airports_key(conn)
+                    if self._table is None or key != self._key:
+                        self._table = _load_pick_table(conn)
+                        self._key = key
+                finally:
+                    conn.close()
+                self._checked = now
+            return self._table
+
+
+_state = _GeoState()
+
+
+# --- вычисления: одинаково выполняются в пуле и в самом процессе ---
+
+def timezone_at(lat: float, lon: float) -> str:
+    return _state.tf().timezone_at(lat=lat, lng=lon) or "UTC"
+
+
+def best_destination(origin: str, lat: float, lon: float, minutes: int) -> str | None:
+    """Airport whose estimated flight time from (lat, lon) is closest to `minutes`."""
+    best, best_d = None, math.inf
+    codes, lats, lons = _state.table()
+    for code, la, lo in zip(codes, lats, lons):
+        if code == origin:
+            continue
+        d = abs(estimate_duration_minutes(haversine_km(lat, lon, la, lo)) - minutes)
+        if d < best_d:
+            best, best_d = code, d
+
+    # если база пустая или не подошла, fallback на AIRPORTS
+    if best is None:
+        for code, a in AIRPORTS.items():
+            if code == origin:
+                continue
+            d = abs(estimate_duration_minutes(haversine_km(lat, lon, a["lat"], a["lon"])) - minutes)
+            if d < best_d:
+                best, best_d = code, d
+    return best
+
+
+def rank_airports(items: list[dict[str, Any]], query: str, limit: int) -> list[dict[str, Any]]:
+    q_up = query.upper()
+    q_lo = query.lower()
+    parts = [p for p in q_lo.split() if p]
+    items.sort(key=lambda a: (-score_item(a["code"], a["name"], q_up, q_lo, parts), a["code"]))
+    return items[:limit]
+
+
+# --- пул процессов ---
+
+def _init_worker() -> None:
+    # Ctrl+C получает вся группа процессов; пул останавливает родитель
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _state.tf()
+    _state.table()
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+class _Pool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: cf.ProcessPoolExecutor | None = None
+        self._retry_at = 0.0
+
+    def executor(self) -> cf.ProcessPoolExecutor | None:
+        if settings.ife_pool_size <= 0:
+            return None
+        with self._lock:
+            if self._executor is None and time.monotonic() >= self._retry_at:
+                # spawn, не fork: родитель многопоточный (uvicorn threadpool, sweeper)
+                self._executor = cf.ProcessPoolExecutor(
+                    max_workers=settings.ife_pool_size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def drop(self, executor: cf.ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self._retry_at = time.monotonic() + settings.ife_pool_retry_s
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def size(self) -> int:
+        return settings.ife_pool_size if self._executor is not None else 0
+
+
+_pool = _Pool()
+metrics.gauge("focusflight_ife_pool_workers", "Processes in the IFE compute pool (0 = in-process).", _pool.size)
+
+
+def start_pool(timeout_s: float = 30.0) -> int:
+    """Spawn the workers and wait until each has loaded its state, so first requests do not time out."""
+    executor = _pool.executor()
+    if executor is None:
+        return 0
+    futures = [executor.submit(_ready) for _ in range(settings.ife_pool_size)]
+    done, _ = cf.wait(futures, timeout=timeout_s)
+    pids = set()
+    for f in done:
+        try:
+            pids.add(f.result())
+        except BrokenProcessPool:
+            _pool.drop(executor)
+            return 0
+    return len(pids)
+
+
+def shutdown_pool() -> None:
+    executor = _pool._executor
+    if executor is not None:
+        _pool.drop(executor)
+
+
+def _timeout_s() -> float:
+    return settings.ife_pool_timeout_ms / 1000
+
+
+def run(fn: Callable[..., Any], *args: Any) -> Any:
+    """fn(*args) in the pool when it is on and healthy; in-process otherwise or if it timed out still queued."""
+    kind = fn.__name__
+    executor = _pool.executor()
+    if executor is None:
+        offloaded.inc(kind=kind, where="local")
+        return fn(*args)
+
+    try:
+        future = executor.submit(fn, *args)
+    except (BrokenProcessPool, RuntimeError):
+        # пул сломан или уже закрыт
+        _pool.drop(executor)
+        offloaded.inc(kind=kind, where="broken")
+        return fn(*args)
+
+    for _ in range(2):
+        try:
+            result = future.result(timeout=_timeout_s())
+            offloaded.inc(kind=kind, where="pool")
+            return result
+        except cf.TimeoutError:
+            if future.cancel():
+                # ещё в очереди: воркер её уже не возьмёт, считаем сами
+                offloaded.inc(kind=kind, where="timeout")
+                return fn(*args)
+            # уже считается в воркере: отменить нельзя, второй расчёт здесь только удвоит
+            # нагрузку — ждём ещё один таймаут, потом отказ
+        except BrokenProcessPool:
+            # воркер упал: дальше в процессе, новый пул через ife_pool_retry_s
+            _pool.drop(executor)
+            offloaded.inc(kind=kind, where="broken")
+            return fn(*args)
+    offloaded.inc(kind=kind, where="shed")
+    raise ComputeBusy(kind)
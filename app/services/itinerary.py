@@ -0,0 +1,228 @@
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from app.core.config import settings
+from app.core.geo import (
+    CRUISE_KMH, OVERHEAD_MIN, bearing_deg, distance_for_minutes, estimate_duration_minutes, haversine_km,
+)
+
+CELL_DEG = 2.0
+BUCKET_MIN = 30
+SECTORS = 8
+MAX_LEG_MIN = 240
+MIN_LEG_MIN = estimate_duration_minutes(0)
+# запас на то, что аэропорт внутри ячейки дальше её центра
+_CELL_SLACK_KM = CELL_DEG * 111.2
+
+
+@dataclass(frozen=True)
+class Airport:
+    code: str
+    name: str
+    lat: float
+    lon: float
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"code": self.code, "name": self.name, "lat": self.lat, "lon": self.lon}
+
+
+class NeighborGraph:
+    """Airports on a CELL_DEG grid; per airport up to SECTORS neighbours (one per bearing sector)
+    in every BUCKET_MIN duration bucket. Edge lists are built on first use and kept."""
+
+    def __init__(self, airports: list[Airport], key: Any = None):
+        self.key = key
+        self.airports = airports
+        self.index = {a.code: i for i, a in enumerate(airports)}
+        self._cells: dict[tuple[int, int], list[int]] = defaultdict(list)
+        for i, a in enumerate(airports):
+            self._cells[self._cell(a.lat, a.lon)].append(i)
+        self._edges: dict[int, list[tuple[int, int, float]]] = {}
+
+    @staticmethod
+    def _cell(lat: float, lon: float) -> tuple[int, int]:
+        return int(math.floor(lat / CELL_DEG)), int(math.floor(lon / CELL_DEG))
+
+    def neighbors(self, u: int) -> list[tuple[int, int, float]]:
+        """(est_minutes, airport index, km), sorted by est_minutes."""
+        edges = self._edges.get(u)
+        if edges is None:
+            edges = self._build(u)
+            self._edges[u] = edges
+        return edges
+
+    def _build(self, u: int) -> list[tuple[int, int, float]]:
+        a = self.airports[u]
+        max_km = distance_for_minutes(MAX_LEG_MIN + 0.5)
+        dlat = (max_km + _CELL_SLACK_KM) / 111.2
+        lat_lo, lat_hi = max(-90.0, a.lat - dlat), min(90.0, a.lat + dlat)
+        min_cos = max(0.02, min(math.cos(math.radians(lat_lo)), math.cos(math.radians(lat_hi))))
+        dlon = min(180.0, dlat / min_cos)
+
+        # 1) по центрам ячеек: для каждой (корзина длительности, сектор) ячейка ближе всего к середине корзины
+        best: dict[tuple[int, int], tuple[float, tuple[int, int]]] = {}
+        ci_lo, ci_hi = self._cell(lat_lo, 0)[0], self._cell(lat_hi, 0)[0]
+        cj_lo, cj_hi = self._cell(0, a.lon - dlon)[1], self._cell(0, a.lon + dlon)[1]
+        n_lon = int(round(360 / CELL_DEG))
+        seen_cols: set[int] = set()
+        for cj in range(cj_lo, cj_hi + 1):
+            col = (cj + n_lon // 2) % n_lon - n_lon // 2
+            if col in seen_cols:
+                continue
+            seen_cols.add(col)
+            for ci in range(ci_lo, ci_hi + 1):
+                if (ci, col) not in self._cells:
+                    continue
+                clat, clon = (ci + 0.5) * CELL_DEG, (col + 0.5) * CELL_DEG
+                km = haversine_km(a.lat, a.lon, clat, clon)
+                if km > max_km + _CELL_SLACK_KM:
+                    continue
+                est = (km / CRUISE_KMH) * 60.0 + OVERHEAD_MIN
+                bucket = int(est // BUCKET_MIN)
+                sector = int(bearing_deg(a.lat, a.lon, clat, clon) // (360 / SECTORS)) % SECTORS
+                off = abs(est - (bucket + 0.5) * BUCKET_MIN)
+                cur = best.get((bucket, sector))
+                if cur is None or off < cur[0]:
+                    best[(bucket, sector)] = (off, (ci, col))
+
+        # 2) в выбранной ячейке — аэропорт с длительностью ближе всего к середине корзины
+        edges: dict[int, tuple[int, int, float]] = {}
+        for (bucket, _), (_, cell) in best.items():
+            mid = (bucket + 0.5) * BUCKET_MIN
+            pick = None
+            for j in self._cells[cell]:
+                if j == u:
+                    continue
+                b = self.airports[j]
+                km = haversine_km(a.lat, a.lon, b.lat, b.lon)
+                est = estimate_duration_minutes(km)
+                if est > MAX_LEG_MIN:
+                    continue
+                if pick is None or abs(est - mid) < abs(pick[0] - mid):
+                    pick = (est, j, km)
+            if pick is not None:
+                edges[pick[1]] = pick
+        return sorted(edges.values())
+
+
+def _lower_bound(target: int, t: int, legs: int, max_legs: int) -> int:
+    # лучшее, что ещё можно получить из частичного маршрута
+    stop = abs(target - t) if legs else target
+    left = max_legs - legs
+    rem = target - t
+    if left == 0 or rem <= 0:
+        return stop
+    if rem >= MIN_LEG_MIN:
+        return max(0, rem - left * MAX_LEG_MIN)
+    return min(stop, MIN_LEG_MIN - rem)
+
+
+def search(graph: NeighborGraph, origin: int, target: int, max_legs: int, budget_s: float) -> dict[str, Any] | None:
+    """Best-first over partial chains ordered by lower bound; stops on an exact match, an empty
+    frontier or the time budget (then the best chain so far is returned, complete=False)."""
+    deadline = time.perf_counter() + budget_s
+    best: tuple[int, int, tuple[int, ...], tuple[tuple[int, float], ...]] | None = None
+    best_err = math.inf
+
+    heap = [(_lower_bound(target, 0, 0, max_legs), target, 0, (origin,), ())]
+    seen: set[tuple[int, int, int]] = set()
+    expanded = 0
+    complete = True
+    while heap:
+        lb, _, t, path, legs = heapq.heappop(heap)
+        if lb >= best_err:
+            break
+        if time.perf_counter() > deadline:
+            complete = False
+            break
+        expanded += 1
+
+        rem = target - t
+        n = len(legs) + 1
+        for est, v, km in graph.neighbors(path[-1]):
+            # рёбра по возрастанию длительности: дальше перелёт только хуже
+            if est - rem >= best_err:
+                break
+            if v in path:
+                continue
+            t2 = t + est
+            err = abs(target - t2)
+            if err < best_err or (err == best_err and best is not None and n < len(best[3])):
+                best_err = err
+                best = (err, t2, path + (v,), legs + ((est, km),))
+                if err == 0:
+                    return _result(graph, best, expanded, True)
+            if n >= max_legs:
+                continue
+            key = (v, t2, n)
+            if key in seen:
+                continue
+            seen.add(key)
+            lb2 = _lower_bound(target, t2, n, max_legs)
+            if lb2 < best_err:
+                heapq.heappush(heap, (lb2, abs(target - t2), t2, path + (v,), legs + ((est, km),)))
+
+    return _result(graph, best, expanded, complete) if best else None
+
+
+def _result(graph: NeighborGraph, best, expanded: int, complete: bool) -> dict[str, Any]:
+    _, total, path, legs = best
+    out = []
+    for (est, km), (u, v) in zip(legs, zip(path, path[1:])):
+        out.append({
+            "from": graph.airports[u].code,
+            "to": graph.airports[v].as_dict(),
+            "km": round(km, 1),
+            "est_minutes": est,
+        })
+    return {"legs": out, "total_minutes": total, "complete": complete, "expanded": expanded}
+
+
+_graph: NeighborGraph | None = None
+_graph_checked = 0.0
+_graph_lock = threading.Lock()
+_results: OrderedDict[tuple, dict[str, Any]] = OrderedDict()
+_results_lock = threading.Lock()
+
+
+def get_graph(key_fn: Callable[[], Any], load_fn: Callable[[], list[Airport]]) -> NeighborGraph:
+    """Process-wide graph, rebuilt when key_fn() (a cheap fingerprint of the airports table) changes."""
+    global _graph, _graph_checked
+    now = time.monotonic()
+    if _graph is not None and now - _graph_checked < settings.airports_check_s:
+        return _graph
+    with _graph_lock:
+        key = key_fn()
+        if _graph is None or _graph.key != key:
+            _graph = NeighborGraph(load_fn(), key)
+            with _results_lock:
+                _results.clear()
+        _graph_checked = now
+        return _graph
+
+
+def cached_search(graph: NeighborGraph, origin: str, minutes: int, max_legs: int) -> tuple[dict[str, Any] | None, bool]:
+    """Search for the centre of the minutes bucket; results cached per (origin, bucket, max_legs)."""
+    step = settings.itinerary_bucket_min
+    bucket = minutes // step
+    key = (graph.key, origin, bucket, max_legs)
+    with _results_lock:
+        hit = _results.get(key)
+        if hit is not None:
+            _results.move_to_end(key)
+            return hit, True
+
+    target = min(MAX_LEG_MIN * max_legs, bucket * step + step // 2) if step > 1 else minutes
+    res = search(graph, graph.index[origin], target, max_legs, settings.itinerary_budget_ms / 1000)
+    # обрезанный по бюджету результат не кэшируем: следующий запрос может найти лучше
+    if res is not None and res["complete"]:
+        with _results_lock:
+            _results[key] = res
+            while len(_results) > settings.itinerary_cache_size:
+                _results.popitem(last=False)
+    return res, False
@@ -1211,6 +1211,76 @@ function updateUI(progress) {
   updateIFEProgress(progress);
 }
 
+/* Live session channel (WebSocket, falls back to plain POSTs) */
+let liveWs = null;
+let liveSeq = 0;
+const livePending = new Map(); // seq -> resolve
+
+function openLive(id) {
+  closeLive();
+  if (!("WebSocket" in window)) return;
+
+  const proto = location.protocol === "https:" ? "wss" : "ws";
+  let ws;
+  try {
+    ws = new WebSocket(`${proto}://${location.host}/api/session/${id}/live`);
+  } catch {
+    return;
+  }
+
+  ws.onmessage = (e) => {
+    let msg;
+    try { msg = JSON.parse(e.data); } catch { return; }
+
+    if (msg.type === "ack") {
+      const resolve = livePending.get(msg.seq);
+      livePending.delete(msg.seq);
+      if (resolve) resolve(msg);
+    } else if (msg.type === "checkpoint_due") {
+      onCheckpointDue(msg.checkpoint_id);
+    }
+  };
+
+  ws.onclose = () => {
+    if (liveWs === ws) liveWs = null;
+    // unacked events may already be written, so report them failed instead of re-POSTing
+    for (const resolve of livePending.values()) resolve({ ok: false, error: "channel closed" });
+    livePending.clear();
+  };
+
+  liveWs = ws;
+}
+
+function closeLive() {
+  if (liveWs) {
+    try { liveWs.close(); } catch { }
+  }
+  liveWs = null;
+}
+
+// resolves with the server ack, or null if the channel is not usable (caller falls back to fetch)
+function liveSend(msg) {
+  if (!liveWs || liveWs.readyState !== WebSocket.OPEN) return Promise.resolve(null);
+
+  liveSeq += 1;
+  const seq = liveSeq;
+  return new Promise((resolve) => {
+    livePending.set(seq, resolve);
+    try {
+      liveWs.send(JSON.stringify({ ...msg, seq }));
+    } catch {
+      livePending.delete(seq);
+      resolve(null);
+    }
+  });
+}
+
+function currentElapsed() {
+  let elapsed = elapsedBeforePause;
+  if (!paused) elapsed += Math.floor((Date.now() - startMs) / 1000);
+  return elapsed;
+}
+
 /* Autopilot checkpoints */
 async function loadCheckpoints() {
   const res = await fetch(`/api/session/${sessionId}/checkpoints`);
@@ -1238,15 +1308,26 @@ function hideCheckpointModal() {
 async function completeCheckpointNow() {
   if (!pendingCheckpointId) return;
   const note = $("checkpointNote").value.trim();
-  await fetch("/api/checkpoint/complete", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ checkpoint_id: pendingCheckpointId, note })
-  });
+  const ack = await liveSend({ type: "checkpoint", checkpoint_id: pendingCheckpointId, note });
+  if (!ack) {
+    await fetch("/api/checkpoint/complete", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ checkpoint_id: pendingCheckpointId, note })
+    });
+  }
   addLog(note ? `Checkpoint done: ${note}` : "Checkpoint done");
   hideCheckpointModal();
 }
 
+function onCheckpointDue(checkpointId) {
+  if (!sessionId || paused || pendingCheckpointId) return;
+  const i = checkpoints.findIndex(cp => cp.id === checkpointId);
+  if (i < nextCheckpointIdx) return;
+  nextCheckpointIdx = i + 1;
+  showCheckpointModal(checkpointId);
+}
+
 function maybeTriggerCheckpoint(elapsedSeconds) {
   while (nextCheckpointIdx < checkpoints.length) {
     const cp = checkpoints[nextCheckpointIdx];
@@ -1390,6 +1471,7 @@ async function startFlight() {
   bumpAmbienceForTakeoff();
 
   await loadCheckpoints();
+  openLive(sessionId);
 
   if (!isRealMode()) {
     const freshMinutes = parseInt($("minutes").value || "50", 10);
@@ -1409,6 +1491,7 @@ function togglePause() {
     paused = true;
     elapsedBeforePause += Math.floor((Date.now() - startMs) / 1000);
     $("pauseBtn").textContent = "Resume";
+    liveSend({ type: "pause", elapsed: elapsedBeforePause });
     setStatus(true, true);
     addLog("Paused.");
     toast("Paused");
@@ -1416,6 +1499,7 @@ function togglePause() {
     paused = false;
     startMs = Date.now();
     $("pauseBtn").textContent = "Pause";
+    liveSend({ type: "resume", elapsed: elapsedBeforePause });
     setStatus(true, false);
     addLog("Resumed.");
     toast("Resumed");
@@ -1428,12 +1512,19 @@ async function logDistraction() {
   const note = $("note").value.trim();
   $("note").value = "";
 
-  const res = await fetch("/api/distraction", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ session_id: sessionId, note })
-  });
-  if (!res.ok) {
+  let ok;
+  const ack = await liveSend({ type: "distraction", note });
+  if (ack) {
+    ok = ack.ok;
+  } else {
+    const res = await fetch("/api/distraction", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ session_id: sessionId, note })
+    });
+    ok = res.ok;
+  }
+  if (!ok) {
     addLog("Failed to log distraction.");
     toast("Log failed");
     return;
@@ -1452,9 +1543,8 @@ async function logDistraction() {
 async function endFlight() {
   if (!sessionId) return;
 
-  let elapsed = elapsedBeforePause;
-  if (!paused) elapsed += Math.floor((Date.now() - startMs) / 1000);
-  elapsed = Math.max(0, Math.min(plannedSeconds, elapsed));
+  const elapsed = Math.max(0, Math.min(plannedSeconds, currentElapsed()));
+  closeLive();
 
   await fetch("/api/session/end", {
     method: "POST",
@@ -0,0 +1,180 @@
+"""Synthetic FocusFlight database for benchmarks (deterministic, offline).
+
+    python -m benchmarks.gen_data --db /tmp/ff_bench.db --airports 75000 --sessions 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import string
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from tools.import_airports import ensure_schema  # noqa: E402
+
+CONTINENTS = ["EU", "NA", "SA", "AS", "AF", "OC"]
+COUNTRIES = ["DE", "FR", "GB", "US", "RU", "KZ", "TR", "AE", "BR", "JP", "AU", "ZA", "IN", "CN", "MX", "ES"]
+WORDS = [
+    "International", "Regional", "Municipal", "Field", "Airbase", "Airstrip", "County", "City",
+    "North", "South", "East", "West", "Lake", "River", "Valley", "Mountain", "Harbor", "Bay",
+]
+SUBJECTS = ["Math", "Physics", "Biology", "History", "Writing", "Reading", "Code review", "Study"]
+GRADES = [("A", 90, 100), ("B", 80, 89), ("C", 65, 79), ("D", 40, 64)]
+BATCH = 20000
+
+
+def _name(rnd: random.Random) -> str:
+    base = "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(4, 9))).capitalize()
+    return f"{base} {rnd.choice(WORDS)}"
+
+
+def gen_airports(conn: sqlite3.Connection, n: int, rnd: random.Random) -> None:
+    ensure_schema(conn)
+    now = datetime.now(timezone.utc).isoformat()
+    seen: set[str] = set()
+    rows = []
+    for i in range(n):
+        ident = f"X{i:06d}"
+        # примерно каждый шестой аэропорт с IATA, как в ourairports
+        iata = None
+        if rnd.random() < 0.17:
+            code = "".join(rnd.choice(string.ascii_uppercase) for _ in range(3))
+            if code not in seen:
+                seen.add(code)
+                iata = code
+        rows.append((
+            iata or ident, ident, iata, _name(rnd), "medium_airport", _name(rnd).split()[0],
+            rnd.uniform(-60, 72), rnd.uniform(-180, 180),
+            rnd.choice(CONTINENTS), rnd.choice(COUNTRIES), None,
+            1 if iata else 0, None, None, None, now,
+        ))
+        if len(rows) >= BATCH:
+            _insert_airports(conn, rows)
+            rows = []
+    _insert_airports(conn, rows)
+
+
+def _insert_airports(conn: sqlite3.Connection, rows: list[tuple]) -> None:
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO airports (
+          code, ident, iata_code, name, type, municipality,
+          lat, lon, continent, iso_country, iso_region,
+          scheduled_service, home_link, wikipedia_link, keywords,
+          source, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'synthetic', ?)
+        """,
+        rows,
+    )
+    conn.commit()
+
+
+def gen_sessions(conn: sqlite3.Connection, n: int, days: int, rnd: random.Random) -> tuple[int, int]:
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    step = timedelta(days=days) / max(1, n)
+    n_dist = 0
+    n_cp = 0
+
+    sess, dist, cps = [], [], []
+    next_id = (conn.execute("SELECT COALESCE(MAX(id), 0) FROM sessions").fetchone()[0] or 0) + 1
+    for i in range(n):
+        sid = next_id + i
+        started = start + step * i
+        planned = rnd.choice([25, 30, 45, 50, 60, 90, 120, 180, 240])
+        actual = int(planned * 60 * rnd.uniform(0.5, 1.0))
+        k = min(12, int(rnd.expovariate(0.6)))
+        grade, lo, hi = rnd.choice(GRADES)
+        sess.append((
+            sid, rnd.choice(SUBJECTS), planned, started.isoformat(),
+            (started + timedelta(seconds=actual)).isoformat(), actual,
+            k, rnd.randint(lo, hi), k * 7, grade,
+        ))
+        for _ in range(k):
+            dist.append((sid, (started + timedelta(seconds=rnd.randint(0, actual))).isoformat(), None))
+        due = 600
+        idx = 1
+        while due <= planned * 60:
+            done = (started + timedelta(seconds=due)).isoformat() if due <= actual else None
+            cps.append((sid, idx, due, started.isoformat(), done, None))
+            idx += 1
+            due += 600
+        if len(sess) >= BATCH:
+            n_dist += len(dist)
+            n_cp += len(cps)
+            _insert_sessions(conn, sess, dist, cps)
+            sess, dist, cps = [], [], []
+
+    n_dist += len(dist)
+    n_cp += len(cps)
+    _insert_sessions(conn, sess, dist, cps)
+    return n_dist, n_cp
+
+
+def _insert_sessions(conn: sqlite3.Connection, sess: list, dist: list, cps: list) -> None:
+    conn.executemany(
+        """
+        INSERT INTO sessions(id, subject, planned_minutes, started_at, ended_at, actual_seconds,
+                             distractions_count, altitude_end, turbulence_end, grade)
+        VALUES (?,?,?,?,?,?,?,?,?,?)
+        """,
+        sess,
+    )
+    conn.executemany("INSERT INTO distractions(session_id, noted_at, note) VALUES (?,?,?)", dist)
+    conn.executemany(
+        "INSERT INTO checkpoints(session_id, idx, due_seconds, created_at, completed_at, note) VALUES (?,?,?,?,?,?)",
+        cps,
+    )
+    conn.commit()
+
+
+def generate(db: str, airports: int, sessions: int, days: int = 365, seed: int = 42) -> dict:
+    os.environ["FOCUSFLIGHT_DB_PATH"] = db
+    from app.core.config import settings
+    from app.core.db import init_db
+
+    if Path(settings.db_path).resolve() != Path(db).resolve():
+        raise SystemExit("app settings were imported before FOCUSFLIGHT_DB_PATH was set")
+
+    init_db()
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(db)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    t0 = time.perf_counter()
+    if airports:
+        gen_airports(conn, airports, rnd)
+    n_dist, n_cp = gen_sessions(conn, sessions, days, rnd) if sessions else (0, 0)
+    conn.execute("ANALYZE")
+    conn.close()
+    return {
+        "db": db,
+        "airports": airports,
+        "sessions": sessions,
+        "distractions": n_dist,
+        "checkpoints": n_cp,
+        "seconds": round(time.perf_counter() - t0, 1),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="bench.db", help="Output SQLite file (created if missing)")
+    ap.add_argument("--airports", type=int, default=75000)
+    ap.add_argument("--sessions", type=int, default=1_000_000)
+    ap.add_argument("--days", type=int, default=365, help="Spread sessions over this many past days")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    info = generate(args.db, args.airports, args.sessions, args.days, args.seed)
+    print(info)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
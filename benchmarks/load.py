@@ -0,0 +1,207 @@
+"""Multi-client load driver replaying the flight lifecycle against uvicorn (offline).
+
+    python -m benchmarks.load --db /tmp/ff_bench.db --clients 16 --duration 30 --out load.json
+
+Each client loops: briefing (airport search, pick, tz) -> session start ->
+checkpoints -> distractions -> checkpoint complete -> end -> stats/history.
+Without --url a local server (python -m app.serve) is started on --db and stopped afterwards.
+With --tenants N the clients are spread over N tenants (X-FocusFlight-Tenant);
+combine with FOCUSFLIGHT_SHARD_MODE=hash FOCUSFLIGHT_SHARD_COUNT=N to measure
+write scaling across shards.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import report  # noqa: E402
+
+FALLBACK_ORIGINS = ["BER", "MUC", "FRA", "AMS", "CDG", "LHR", "IST", "JFK", "DXB"]
+SEARCH_TERMS = ["be", "ber", "mun", "lon", "int", "new", "par", "ist", "field", "regional"]
+
+
+class Client:
+    def __init__(self, host: str, port: int, stats: dict, lock: threading.Lock, tenant: str | None = None):
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+        self.stats = stats
+        self.lock = lock
+        self.tenant = tenant
+
+    def call(self, label: str, method: str, path: str, body: dict | None = None):
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        if self.tenant:
+            headers["X-FocusFlight-Tenant"] = self.tenant
+        data = json.dumps(body).encode() if body is not None else None
+        t0 = time.perf_counter()
+        ok = False
+        payload = None
+        try:
+            self.conn.request(method, path, body=data, headers=headers)
+            resp = self.conn.getresponse()
+            raw = resp.read()
+            ok = resp.status < 400
+            if ok and resp.getheader("Content-Type", "").startswith("application/json"):
+                payload = json.loads(raw)
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+        elapsed = time.perf_counter() - t0
+        with self.lock:
+            s = self.stats[label]
+            s["lat"].append(elapsed)
+            s["errors"] += 0 if ok else 1
+        return payload
+
+
+def flight(c: Client, rnd: random.Random, origins: list[str], export_every: int, n: int) -> None:
+    # briefing
+    c.call("GET /api/ife/airports/search", "GET", f"/api/ife/airports/search?q={rnd.choice(SEARCH_TERMS)}&limit=20")
+    minutes = rnd.choice([25, 45, 50, 60, 90, 120])
+    origin = rnd.choice(origins)
+    p = c.call("GET /api/ife/pick", "GET", f"/api/ife/pick?minutes={minutes}&origin={origin}") or {}
+    if p.get("dest"):
+        c.call("GET /api/ife/tz", "GET", f"/api/ife/tz?lat={p['dest']['lat']}&lon={p['dest']['lon']}")
+
+    s = c.call("POST /api/session/start", "POST", "/api/session/start", {"subject": "Load", "planned_minutes": minutes})
+    if not s:
+        return
+    sid = s["session_id"]
+
+    cps = (c.call("GET /api/session/{session_id}/checkpoints", "GET", f"/api/session/{sid}/checkpoints") or {}).get("items", [])
+    for _ in range(rnd.randint(0, 4)):
+        c.call("POST /api/distraction", "POST", "/api/distraction", {"session_id": sid, "note": "load"})
+    if cps:
+        c.call("POST /api/checkpoint/complete", "POST", "/api/checkpoint/complete", {"checkpoint_id": cps[0]["id"]})
+
+    c.call("POST /api/session/end", "POST", "/api/session/end", {
+        "session_id": sid, "actual_seconds": minutes * 60, "altitude_end": rnd.randint(50, 100), "turbulence_end": 7,
+    })
+
+    c.call("GET /api/stats/today", "GET", "/api/stats/today")
+    c.call("GET /api/sessions/recent", "GET", "/api/sessions/recent?limit=10")
+    c.call("GET /api/sessions", "GET", "/api/sessions?limit=20")
+    if export_every and n % export_every == 0:
+        c.call("GET /api/export/sessions.csv", "GET", "/api/export/sessions.csv")
+
+
+def sample_origins(db: str | None) -> list[str]:
+    if not db or not Path(db).exists():
+        return FALLBACK_ORIGINS
+    con = sqlite3.connect(db)
+    try:
+        rows = con.execute(
+            "SELECT iata_code FROM airports WHERE iata_code IS NOT NULL AND length(iata_code) = 3 LIMIT 500"
+        ).fetchall()
+    except sqlite3.Error:
+        rows = []
+    con.close()
+    return [r[0] for r in rows] or FALLBACK_ORIGINS
+
+
+def start_server(db: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, FOCUSFLIGHT_DB_PATH=str(Path(db).resolve()))
+    proc = subprocess.Popen(
+        # app.serve, как в проде: startup один раз в мастере, воркеры в multiprocess-режиме
+        [sys.executable, "-m", "app.serve", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            c = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            c.request("GET", "/api/stats/today")
+            if c.getresponse().status == 200:
+                return proc
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("server did not come up")
+
+
+def run(
+    url: str, clients: int, duration: float, origins: list[str], export_every: int, seed: int, tenants: int = 0
+) -> dict:
+    u = urlsplit(url)
+    stats: dict = defaultdict(lambda: {"lat": [], "errors": 0})
+    lock = threading.Lock()
+    flights = [0]
+    stop_at = time.perf_counter() + duration
+
+    def worker(i: int):
+        rnd = random.Random(seed + i)
+        c = Client(u.hostname, u.port or 80, stats, lock, f"bench-{i % tenants}" if tenants else None)
+        n = 0
+        while time.perf_counter() < stop_at:
+            n += 1
+            flight(c, rnd, origins, export_every, n)
+            with lock:
+                flights[0] += 1
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    results = {name: report.summarize(s["lat"], wall, s["errors"]) for name, s in sorted(stats.items())}
+    all_lat = [x for s in stats.values() for x in s["lat"]]
+    results["ALL"] = report.summarize(all_lat, wall, sum(s["errors"] for s in stats.values()))
+    results["ALL"]["flights_per_s"] = round(flights[0] / wall, 2)
+    return results
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default=None, help="Target an already running server instead of starting one")
+    ap.add_argument("--db", default="bench.db", help="Database for the local server (see benchmarks.gen_data)")
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=20.0, help="Seconds")
+    ap.add_argument("--export-every", type=int, default=0, help="Each client downloads the CSV every N flights")
+    ap.add_argument("--tenants", type=int, default=0, help="Spread clients over this many tenants (0 = default)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default=None, help="Write JSON results here")
+    args = ap.parse_args()
+
+    proc = None
+    url = args.url
+    if url is None:
+        if not Path(args.db).exists():
+            from benchmarks.gen_data import generate
+
+            generate(args.db, airports=5000, sessions=10000)
+        proc = start_server(args.db, args.port, args.workers)
+        url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        results = run(
+            url, args.clients, args.duration, sample_origins(args.db), args.export_every, args.seed, args.tenants
+        )
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=15)
+
+    params = {k: getattr(args, k) for k in ("url", "db", "workers", "clients", "duration", "export_every", "tenants", "seed")}
+    report.write(report.envelope("load", params, results), args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,92 @@
+"""Micro-benchmarks: haversine_km, score_item and the CSV export.
+
+    python -m benchmarks.micro --db /tmp/ff_bench.db --out micro.json
+
+The export benchmark runs against --db (see benchmarks.gen_data); without one a
+small temporary database is generated first.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import report  # noqa: E402
+
+
+def bench(fn, repeat: int, number: int) -> dict:
+    # repeat раз по number вызовов; латентность = время одного вызова
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number)
+    res = report.summarize(samples, wall_s=0)
+    del res["rps"]
+    res["ops_per_s"] = round(len(samples) / sum(samples), 1)
+    return res
+
+
+def run(db: str, repeat: int) -> dict:
+    os.environ["FOCUSFLIGHT_DB_PATH"] = db
+    from app.core.geo import haversine_km
+    from app.services.ife_compute import score_item
+    from app.repositories.sessions_repo import SessionsRepo
+    from app.services.export_csv import export_sessions_csv
+
+    rnd = random.Random(7)
+    coords = [(rnd.uniform(-60, 72), rnd.uniform(-180, 180)) for _ in range(1000)]
+
+    def haversine_batch():
+        o = coords[0]
+        for lat, lon in coords:
+            haversine_km(o[0], o[1], lat, lon)
+
+    names = [("BER", "Berlin Brandenburg"), ("TXL", "Berlin Tegel"), ("MUC", "Munich"), ("LHR", "London Heathrow")] * 55
+
+    def score_batch():
+        q = "berlin"
+        parts = q.split()
+        for code, name in names:
+            score_item(code, name, q.upper(), q, parts)
+
+    repo = SessionsRepo()
+
+    return {
+        "haversine_km x1000": bench(haversine_batch, repeat=repeat, number=20),
+        "score_item x220": bench(score_batch, repeat=repeat, number=50),
+        "export_sessions_csv": bench(lambda: export_sessions_csv(repo), repeat=max(3, repeat // 10), number=1),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=None, help="Database for the export benchmark")
+    ap.add_argument("--sessions", type=int, default=20000, help="Sessions to generate when --db is not given")
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--out", default=None, help="Write JSON results here")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = args.db
+        if db is None:
+            from benchmarks.gen_data import generate
+
+            db = str(Path(tmp) / "micro.db")
+            generate(db, airports=0, sessions=args.sessions)
+
+        results = run(db, args.repeat)
+
+    params = {"db": args.db or f"generated:{args.sessions}", "repeat": args.repeat}
+    report.write(report.envelope("micro", params, results), args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,97 @@
+"""Shared result format for the benchmark scripts, plus a diff of two result files.
+
+    python -m benchmarks.report old.json new.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies_s: list[float], wall_s: float, errors: int = 0) -> dict:
+    v = sorted(latencies_s)
+    return {
+        "count": len(v),
+        "errors": errors,
+        "rps": round(len(v) / wall_s, 2) if wall_s > 0 else 0.0,
+        "p50_ms": round(percentile(v, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(v, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(v, 0.99) * 1000, 3),
+        "max_ms": round(v[-1] * 1000, 3) if v else 0.0,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def envelope(kind: str, params: dict, results: dict) -> dict:
+    return {
+        "kind": kind,
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params,
+        "results": results,
+    }
+
+
+def write(doc: dict, out: str | None) -> None:
+    text = json.dumps(doc, indent=2, sort_keys=True)
+    if out:
+        Path(out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    lines = [f"{old.get('commit')} -> {new.get('commit')} ({new.get('kind')})"]
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        a = old["results"].get(name)
+        b = new["results"].get(name)
+        if a is None or b is None:
+            lines.append(f"  {name}: only in {'new' if a is None else 'old'}")
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "rps", "ops_per_s"):
+            if key in a and key in b and a[key]:
+                delta = (b[key] - a[key]) / a[key] * 100
+                cells.append(f"{key} {a[key]:g} -> {b[key]:g} ({delta:+.1f}%)")
+        lines.append(f"  {name}: " + ", ".join(cells))
+    return lines
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("old")
+    ap.add_argument("new")
+    args = ap.parse_args()
+
+    old = json.loads(Path(args.old).read_text(encoding="utf-8"))
+    new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+    print("\n".join(compare(old, new)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
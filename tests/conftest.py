@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Settings читает окружение при импорте app.*: временная база до первого импорта
+_tmp = tempfile.mkdtemp(prefix="focusflight-tests-")
+os.environ["FOCUSFLIGHT_DB_PATH"] = os.path.join(_tmp, "focusflight.db")
+os.environ["FOCUSFLIGHT_SHARD_DIR"] = os.path.join(_tmp, "shards")
+os.environ["FOCUSFLIGHT_ARCHIVE_DIR"] = os.path.join(_tmp, "archive")
+# тенанты кроме default уходят в отдельные файлы шардов
+os.environ["FOCUSFLIGHT_SHARD_MODE"] = "hash"
+os.environ["FOCUSFLIGHT_SHARD_COUNT"] = "2"
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+
+from app.core import admission as admission_mod
+from app.core.admission import BULK, PLAN, WRITE, Admission, AdmissionMiddleware, PriorityClass
+
+
+def _admission(max_inflight: int = 1, queue_size: int = 4, deadline_s: float = 1.0) -> Admission:
+    return Admission(
+        max_inflight,
+        [PriorityClass(WRITE, max_inflight, deadline_s), PriorityClass(PLAN, 1, deadline_s), PriorityClass(BULK, 1, deadline_s)],
+        queue_size,
+    )
+
+
+def _scope(method: str, path: str) -> dict:
+    return {"type": "http", "method": method, "path": path, "headers": [], "query_string": b""}
+
+
+async def _call(middleware: AdmissionMiddleware, scope: dict) -> list[dict]:
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware(scope, receive, send)
+    return sent
+
+
+async def _ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _status(sent: list[dict]) -> int:
+    return next(m["status"] for m in sent if m["type"] == "http.response.start")
+
+
+def _header(sent: list[dict], name: bytes) -> bytes | None:
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    return dict(start["headers"]).get(name)
+
+
+def test_freed_slots_go_write_then_plan_then_bulk():
+    async def scenario():
+        a = _admission()
+        bulk, plan, write = (a.classes[n] for n in (BULK, PLAN, WRITE))
+        assert await a.acquire(bulk, "/hold", None) is None
+
+        granted = []
+
+        async def wait(c):
+            assert await a.acquire(c, "/r-" + c.name, None) is None
+            granted.append(c.name)
+
+        # приходят в обратном порядке приоритета
+        tasks = [asyncio.create_task(wait(c)) for c in (bulk, plan, write)]
+        await asyncio.sleep(0)
+        a.release(bulk, "/hold")
+        for c in (write, plan, bulk):
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            a.release(c, "/r-" + c.name)
+        await asyncio.gather(*tasks)
+        return granted, a.active
+
+    granted, active = asyncio.run(scenario())
+    assert granted == [WRITE, PLAN, BULK]
+    assert active == 0
+
+
+def test_full_queue_is_shed_with_429(monkeypatch):
+    async def scenario():
+        a = _admission(queue_size=1)
+        monkeypatch.setattr(admission_mod, "admission", a)
+        plan = a.classes[PLAN]
+        assert await a.acquire(plan, "/hold", None) is None
+        queued = asyncio.create_task(a.acquire(plan, "/api/session", None))
+        await asyncio.sleep(0)
+
+        sent = await _call(AdmissionMiddleware(_ok_app), _scope("GET", "/api/session/1"))
+        a.release(plan, "/hold")
+        assert await queued is None
+        a.release(plan, "/api/session")
+        return sent, a.active
+
+    sent, active = asyncio.run(scenario())
+    assert _status(sent) == 429
+    assert _header(sent, b"retry-after") == b"1"
+    assert active == 0
+
+
+def test_expired_deadline_is_shed_with_503(monkeypatch):
+    async def scenario():
+        a = _admission(deadline_s=0.02)
+        monkeypatch.setattr(admission_mod, "admission", a)
+        plan = a.classes[PLAN]
+        assert await a.acquire(plan, "/hold", None) is None
+
+        sent = await _call(AdmissionMiddleware(_ok_app), _scope("GET", "/api/session/1"))
+        a.release(plan, "/hold")
+        return sent, a
+
+    sent, a = asyncio.run(scenario())
+    assert _status(sent) == 503
+    assert _header(sent, b"retry-after") == b"1"
+    assert a.active == 0 and not a.classes[PLAN].waiters
+
+
+def test_slot_granted_to_cancelled_client_is_returned(monkeypatch):
+    async def scenario():
+        a = _admission()
+        monkeypatch.setattr(admission_mod, "admission", a)
+        plan = a.classes[PLAN]
+        assert await a.acquire(plan, "/hold", None) is None
+
+        task = asyncio.create_task(_call(AdmissionMiddleware(_ok_app), _scope("GET", "/api/session/1")))
+        await asyncio.sleep(0)
+        # слот выдан, но ждущий ещё не проснулся — и клиент уходит
+        a.release(plan, "/hold")
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return a
+
+    a = asyncio.run(scenario())
+    assert a.active == 0
+    assert a.classes[PLAN].active == 0 and not a.classes[PLAN].waiters
+
+
+def test_slot_granted_as_deadline_fires_is_returned(monkeypatch):
+    async def scenario():
+        a = _admission()
+        plan = a.classes[PLAN]
+        assert await a.acquire(plan, "/hold", None) is None
+
+        async def late_wait_for(fut, timeout):
+            # 3.12+: слот успели выдать, но wait_for всё равно бросает TimeoutError
+            a.release(plan, "/hold")
+            assert fut.done() and not fut.cancelled()
+            raise asyncio.TimeoutError
+
+        monkeypatch.setattr(asyncio, "wait_for", late_wait_for)
+        reason = await a.acquire(plan, "/api/session", None)
+        return reason, a
+
+    reason, a = asyncio.run(scenario())
+    assert reason == "deadline"
+    assert a.active == 0 and a.classes[PLAN].active == 0
+
+
+@pytest.mark.parametrize("method,path,cls", [
+    ("POST", "/api/session/start", WRITE),
+    ("HEAD", "/api/export/sessions.csv", BULK),
+    ("GET", "/api/ife/airports", BULK),
+    ("GET", "/api/ife/itinerary", PLAN),
+])
+def test_classify(method, path, cls):
+    assert admission_mod.classify(method, path)[0] == cls
@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+from app.core.db import connect, init_db
+from app.repositories.sessions_repo import SessionsRepo
+from app.services import archive
+from app.services.export_csv import export_distractions_csv, export_sessions_csv
+
+OLD = "2020-01-15T10:00:00+00:00"
+
+
+@pytest.fixture()
+def repo():
+    init_db()
+    return SessionsRepo()
+
+
+def _old_session(r: SessionsRepo) -> int:
+    # завершённая сессия с отвлечением и закрытым чекпоинтом, сдвинутая за порог архивации
+    sid = r.create_session("Archive", 30)
+    r.ensure_checkpoints(sid, 30)
+    r.add_distraction(sid, "phone")
+    r.complete_checkpoint(r.list_checkpoints(sid)[0]["id"], "ok")
+    r.end_session(sid, 1800, 90, 1, "A")
+    con = connect(r.shard.path)
+    con.execute("UPDATE sessions SET started_at = ?, ended_at = ? WHERE id = ?", (OLD, OLD, sid))
+    con.execute("UPDATE distractions SET noted_at = ? WHERE session_id = ?", (OLD, sid))
+    con.commit()
+    con.close()
+    return sid
+
+
+def _hot_rows(r: SessionsRepo, sid: int) -> tuple[int, int]:
+    con = connect(r.shard.path)
+    d = con.execute("SELECT COUNT(*) FROM distractions WHERE session_id = ?", (sid,)).fetchone()[0]
+    c = con.execute("SELECT COUNT(*) FROM checkpoints WHERE session_id = ?", (sid,)).fetchone()[0]
+    con.close()
+    return d, c
+
+
+def _archived_rows(r: SessionsRepo, sid: int) -> tuple[int, int]:
+    path = r.shard.archive_path(OLD[:7])
+    if not os.path.exists(path):
+        return 0, 0
+    con = connect(path)
+    d = con.execute("SELECT COUNT(*) FROM distractions WHERE session_id = ?", (sid,)).fetchone()[0]
+    c = con.execute("SELECT COUNT(*) FROM checkpoints WHERE session_id = ?", (sid,)).fetchone()[0]
+    con.close()
+    return d, c
+
+
+def test_archive_restore_round_trip(repo):
+    r = repo.for_tenant("archive-trip")
+    sid = _old_session(r)
+    checkpoints = r.list_checkpoints(sid)
+    hot = _hot_rows(r, sid)
+
+    archive.run_archive(90)
+    assert _hot_rows(r, sid) == (0, 0)
+    assert _archived_rows(r, sid) == hot
+
+    assert archive.restore_tenant(r.shard, r.tenant) == 1
+    assert _hot_rows(r, sid) == hot
+    assert _archived_rows(r, sid) == (0, 0)
+    assert r.list_checkpoints(sid) == checkpoints
+    con = connect(r.shard.path)
+    row = con.execute("SELECT archived_month FROM sessions WHERE id = ?", (sid,)).fetchone()
+    con.close()
+    assert row["archived_month"] is None
+
+
+def test_archive_rerun_is_idempotent(repo):
+    r = repo.for_tenant("archive-rerun")
+    sid = _old_session(r)
+    hot = _hot_rows(r, sid)
+
+    archive.run_archive(90)
+    again = {s["shard"]: s for s in archive.run_archive(90)}
+    assert again[r.shard.name]["sessions"] == 0
+    assert _archived_rows(r, sid) == hot
+    assert _hot_rows(r, sid) == (0, 0)
+
+
+def test_reads_see_archived_rows(repo):
+    r = repo.for_tenant("archive-reads")
+    sid = _old_session(r)
+    checkpoints = r.list_checkpoints(sid)
+    sessions_csv = export_sessions_csv(r)
+    distractions_csv = export_distractions_csv(r)
+
+    archive.run_archive(90)
+    assert r.list_checkpoints(sid) == checkpoints
+    assert export_sessions_csv(r) == sessions_csv
+    assert export_distractions_csv(r) == distractions_csv
+    assert "phone" in distractions_csv
+
+
+def test_vacuum_releases_free_pages_in_chunks(repo, monkeypatch):
+    r = repo.for_tenant("archive-vacuum")
+    r.create_session("Archive", 30)
+    shard = r.shard
+    con = connect(shard.path)
+    assert con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    con.execute("CREATE TABLE scratch(b BLOB)")
+    con.executemany("INSERT INTO scratch VALUES (zeroblob(4000))", [()] * 1000)
+    con.commit()
+    con.execute("DROP TABLE scratch")
+    con.commit()
+    free = con.execute("PRAGMA freelist_count").fetchone()[0]
+    assert free > archive.settings.archive_vacuum_pages
+
+    steps = []
+    step = archive._vacuum_step
+    monkeypatch.setattr(archive, "_vacuum_step", lambda c, pages: (steps.append(pages), step(c, pages)))
+    assert archive.vacuum_shard(shard)
+
+    assert len(steps) > 1
+    assert all(p == archive.settings.archive_vacuum_pages for p in steps)
+    assert con.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    con.close()
@@ -0,0 +1,87 @@
+import concurrent.futures as cf
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services import ife_compute
+
+
+def double(x: int) -> int:
+    return 2 * x
+
+
+class _FakeExecutor:
+    """submit() hands out a prepared future instead of running anything."""
+
+    def __init__(self, future: cf.Future | None = None, error: Exception | None = None):
+        self.future = future
+        self.error = error
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        if self.error is not None:
+            raise self.error
+        return self.future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+@pytest.fixture()
+def pool(monkeypatch):
+    monkeypatch.setattr(ife_compute, "_timeout_s", lambda: 0.01)
+    dropped = []
+    monkeypatch.setattr(ife_compute._pool, "drop", dropped.append)
+
+    def use(executor: _FakeExecutor) -> list:
+        monkeypatch.setattr(ife_compute._pool, "executor", lambda: executor)
+        return dropped
+
+    return use
+
+
+def test_result_from_pool(pool):
+    future = cf.Future()
+    future.set_result(42)
+    pool(_FakeExecutor(future))
+    assert ife_compute.run(double, 1) == 42
+
+
+def test_timed_out_while_queued_runs_in_process(pool):
+    future = cf.Future()
+    pool(_FakeExecutor(future))
+    assert ife_compute.run(double, 21) == 42
+    assert future.cancelled()
+
+
+def test_timed_out_while_running_is_shed(pool):
+    # воркер уже взял задачу: cancel() не сработает, второй расчёт в процессе не запускаем
+    future = cf.Future()
+    assert future.set_running_or_notify_cancel()
+    pool(_FakeExecutor(future))
+    calls = []
+    with pytest.raises(ife_compute.ComputeBusy):
+        ife_compute.run(lambda x: calls.append(x), 1)
+    assert calls == []
+
+
+def test_broken_pool_on_result_runs_in_process(pool):
+    future = cf.Future()
+    future.set_exception(BrokenProcessPool())
+    executor = _FakeExecutor(future)
+    dropped = pool(executor)
+    assert ife_compute.run(double, 21) == 42
+    assert dropped == [executor]
+
+
+def test_broken_pool_on_submit_runs_in_process(pool):
+    executor = _FakeExecutor(error=BrokenProcessPool())
+    dropped = pool(executor)
+    assert ife_compute.run(double, 21) == 42
+    assert dropped == [executor]
+
+
+def test_pool_off_runs_in_process(monkeypatch):
+    monkeypatch.setattr(ife_compute._pool, "executor", lambda: None)
+    assert ife_compute.run(double, 21) == 42
@@ -0,0 +1,127 @@
+import math
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import itinerary
+from app.services.itinerary import MAX_LEG_MIN, MIN_LEG_MIN, Airport, NeighborGraph, _lower_bound, search
+
+
+def _graph(key="g1") -> NeighborGraph:
+    # сетка 5x5 аэропортов через 1.5 градуса над Германией: рёбра от ~30 до ~90 минут
+    airports = [
+        Airport(f"A{i}{j}", f"Airport {i}{j}", 48.0 + 1.5 * i, 9.0 + 1.5 * j)
+        for i in range(5) for j in range(5)
+    ]
+    return NeighborGraph(airports, key)
+
+
+def _best_error(graph: NeighborGraph, origin: int, target: int, max_legs: int) -> int:
+    # полный перебор цепочек без повторов по тем же рёбрам, что видит search
+    best = math.inf
+
+    def walk(path: tuple[int, ...], t: int) -> None:
+        nonlocal best
+        for est, v, _ in graph.neighbors(path[-1]):
+            if v in path:
+                continue
+            best = min(best, abs(target - (t + est)))
+            if len(path) < max_legs:
+                walk(path + (v,), t + est)
+
+    walk((origin,), 0)
+    return best
+
+
+def _completion_error(target: int, t: int, legs: int, max_legs: int) -> int:
+    # лучшая достижимая ошибка для любых длительностей перелётов в [MIN_LEG_MIN, MAX_LEG_MIN]
+    rem = target - t
+    best = math.inf
+    for k in range(0 if legs else 1, max_legs - legs + 1):
+        lo, hi = k * MIN_LEG_MIN, k * MAX_LEG_MIN
+        best = min(best, 0 if lo <= rem <= hi else min(abs(rem - lo), abs(rem - hi)))
+    return best
+
+
+def _assert_valid_chain(graph: NeighborGraph, origin: int, res: dict, max_legs: int) -> None:
+    assert 1 <= len(res["legs"]) <= max_legs
+    codes = [graph.airports[origin].code]
+    total = 0
+    for leg in res["legs"]:
+        assert leg["from"] == codes[-1]
+        u, v = graph.index[leg["from"]], graph.index[leg["to"]["code"]]
+        assert (leg["est_minutes"], v) in {(est, j) for est, j, _ in graph.neighbors(u)}
+        codes.append(leg["to"]["code"])
+        total += leg["est_minutes"]
+    assert len(set(codes)) == len(codes)
+    assert res["total_minutes"] == total
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    itinerary._results.clear()
+    yield
+    itinerary._results.clear()
+
+
+@pytest.mark.parametrize("max_legs", [1, 2, 3, 4])
+def test_lower_bound_is_admissible(max_legs):
+    for target in range(5, MAX_LEG_MIN * max_legs + 60, 7):
+        for legs in range(max_legs + 1):
+            for t in range(0, target + MAX_LEG_MIN, 11) if legs else [0]:
+                assert _lower_bound(target, t, legs, max_legs) <= _completion_error(target, t, legs, max_legs), (
+                    target, t, legs, max_legs
+                )
+
+
+@pytest.mark.parametrize("target,max_legs", [(45, 1), (100, 2), (137, 2), (180, 3), (233, 3)])
+def test_search_finds_the_best_chain(target, max_legs):
+    graph = _graph()
+    res = search(graph, 0, target, max_legs, 10.0)
+    assert res["complete"]
+    _assert_valid_chain(graph, 0, res, max_legs)
+    assert abs(target - res["total_minutes"]) == _best_error(graph, 0, target, max_legs)
+
+
+def test_search_out_of_budget_returns_a_valid_partial_answer(monkeypatch):
+    graph = _graph()
+    target, max_legs = 233, 4
+    # каждый вызов perf_counter — «миллисекунда»: бюджет кончается после нескольких раскрытий
+    clock = iter(range(10**6))
+    monkeypatch.setattr(itinerary, "time", SimpleNamespace(
+        perf_counter=lambda: next(clock) / 1000, monotonic=time.monotonic,
+    ))
+
+    res = search(graph, 0, target, max_legs, 0.003)
+    assert res is not None and not res["complete"]
+    assert 0 < res["expanded"] <= 3
+    _assert_valid_chain(graph, 0, res, max_legs)
+    assert abs(target - res["total_minutes"]) >= _best_error(graph, 0, target, max_legs)
+
+    # урезанный ответ не кэшируется (тут каждый вызов — 10 мс, бюджет из настроек)
+    monkeypatch.setattr(itinerary.time, "perf_counter", lambda: next(clock) / 100)
+    graph_res, cached = itinerary.cached_search(graph, "A00", target, max_legs)
+    assert not cached and not graph_res["complete"]
+    assert not itinerary._results
+
+
+def test_cache_is_keyed_by_graph_origin_bucket_and_legs():
+    g1, g2 = _graph("g1"), _graph("g2")
+    step = itinerary.settings.itinerary_bucket_min
+
+    first, cached = itinerary.cached_search(g1, "A00", 120, 2)
+    assert not cached and first["complete"]
+    # та же корзина минут — тот же ответ из кэша
+    assert itinerary.cached_search(g1, "A00", 120 + step - 1, 2) == (first, True)
+
+    for graph, origin, minutes, max_legs in [
+        (g2, "A00", 120, 2),
+        (g1, "A44", 120, 2),
+        (g1, "A00", 120 + step, 2),
+        (g1, "A00", 120, 3),
+    ]:
+        res, cached = itinerary.cached_search(graph, origin, minutes, max_legs)
+        assert not cached, (graph.key, origin, minutes, max_legs)
+        assert res["legs"][0]["from"] == origin
+    assert len(itinerary._results) == 5
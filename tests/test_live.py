@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+
+from app.api import routes_live
+from app.core.db import connect, init_db
+
+
+@pytest.fixture()
+def app():
+    init_db()
+    a = FastAPI()
+    a.include_router(routes_live.router)
+    return a
+
+
+def _frames(*events) -> list[dict]:
+    # dict -> JSON-кадр, str -> как есть, bytes -> бинарный кадр
+    out = []
+    for e in events:
+        if isinstance(e, bytes):
+            out.append({"type": "websocket.receive", "bytes": e})
+        else:
+            out.append({"type": "websocket.receive", "text": e if isinstance(e, str) else json.dumps(e)})
+    return out
+
+
+async def _run(app, session_id: int, frames: list[dict]) -> list[dict]:
+    # ASGI-клиент без httpx: кадры отдаются по очереди, потом клиент отключается
+    incoming = [{"type": "websocket.connect"}, *frames, {"type": "websocket.disconnect", "code": 1000}]
+    sent = []
+
+    async def receive():
+        if incoming:
+            return incoming.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "websocket", "path": f"/api/session/{session_id}/live", "raw_path": b"",
+        "query_string": b"", "headers": [], "scheme": "ws", "root_path": "",
+        "server": ("test", 80), "client": ("test", 1), "subprotocols": [],
+    }
+    await asyncio.wait_for(app(scope, receive, send), 5)
+    return sent
+
+
+def _acks(sent: list[dict]) -> list[dict]:
+    out = []
+    for m in sent:
+        if m["type"] == "websocket.send":
+            msg = json.loads(m["text"])
+            if msg["type"] == "ack":
+                out.append(msg)
+    return out
+
+
+def test_events_are_applied_and_acked_in_order(app):
+    r = routes_live.repo
+    sid = r.create_session("Live", 30)
+    r.ensure_checkpoints(sid, 30)
+    cid = r.list_checkpoints(sid)[0]["id"]
+
+    sent = asyncio.run(_run(app, sid, _frames(
+        {"type": "distraction", "seq": 1, "note": " phone "},
+        "{not json",
+        {"type": "checkpoint", "seq": 3, "checkpoint_id": cid, "note": "done"},
+        {"type": "checkpoint", "seq": 4, "checkpoint_id": 10**9},
+        {"type": "ping", "seq": 5},
+        {"type": "teleport", "seq": 6},
+        {"type": "distraction", "seq": 7},
+    )))
+
+    assert sent[0]["type"] == "websocket.accept"
+    assert [(a["seq"], a["ok"], a.get("error")) for a in _acks(sent)] == [
+        (1, True, None),
+        (None, False, "bad event"),
+        (3, True, None),
+        (4, False, "not found"),
+        (5, True, None),
+        (6, False, "bad event"),
+        (7, True, None),
+    ]
+    assert not any(m["type"] == "websocket.close" for m in sent)
+    assert routes_live._live_connections == 0
+
+    con = connect()
+    row = con.execute("SELECT distractions_count FROM sessions WHERE id = ?", (sid,)).fetchone()
+    notes = [n[0] for n in con.execute("SELECT note FROM distractions WHERE session_id = ? ORDER BY id", (sid,))]
+    cp = con.execute("SELECT completed_at, note FROM checkpoints WHERE id = ?", (cid,)).fetchone()
+    con.close()
+    assert row["distractions_count"] == 2
+    assert notes == ["phone", None]
+    assert cp["completed_at"] is not None and cp["note"] == "done"
+    r.end_session(sid, 60, 100, 0, None)
+
+
+def test_binary_frame_closes_with_unsupported_data(app):
+    r = routes_live.repo
+    sid = r.create_session("Live", 30)
+
+    sent = asyncio.run(_run(app, sid, _frames(
+        {"type": "distraction", "seq": 1},
+        b"\x00\x01",
+        {"type": "distraction", "seq": 2},
+    )))
+
+    assert [a["seq"] for a in _acks(sent)] == [1]
+    assert sent[-1] == {"type": "websocket.close", "code": 1003, "reason": ""}
+    assert routes_live._live_connections == 0
+    r.end_session(sid, 60, 100, 0, None)
+
+
+def test_unknown_session_is_rejected(app):
+    sent = asyncio.run(_run(app, 10**9, []))
+    assert sent[0]["type"] == "websocket.close" and sent[0]["code"] == 4400
+    assert routes_live._live_connections == 0
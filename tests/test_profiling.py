@@ -0,0 +1,29 @@
+import dataclasses
+
+import pytest
+
+from app.core import profiling
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setattr(profiling, "settings", dataclasses.replace(profiling.settings, admin_token="s3cret"))
+
+
+def _scope(headers=(), query=b"") -> dict:
+    return {"type": "http", "headers": list(headers), "query_string": query}
+
+
+def test_token_in_header_requests_a_profile():
+    assert profiling._requested(_scope([(profiling.PROFILE_HEADER, b"s3cret")]))
+
+
+@pytest.mark.parametrize("scope", [
+    _scope(),
+    _scope([(profiling.PROFILE_HEADER, b"wrong")]),
+    _scope([(profiling.PROFILE_HEADER, "sécret".encode())]),
+    # в query string токен не принимается: он попал бы в access-логи
+    _scope(query=b"__profile=s3cret"),
+])
+def test_anything_else_does_not(scope):
+    assert not profiling._requested(scope)
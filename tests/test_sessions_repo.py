@@ -0,0 +1,146 @@
+import pytest
+
+from app.core.db import connect, init_db
+from app.core.utils import utc_now_iso
+from app.repositories.sessions_repo import SessionsRepo, _abandoned_in_db
+from app.repositories.shards import MAIN_SHARD, Shard, shard_router
+
+
+@pytest.fixture()
+def repo():
+    init_db()
+    r = SessionsRepo()
+    r.load_open_sessions()
+    return r
+
+
+def _insert_session_elsewhere(planned_minutes: int = 50) -> int:
+    # как будто сессию открыл другой воркер: строка в базе, в реестре этого процесса её нет
+    con = connect()
+    cur = con.execute(
+        "INSERT INTO sessions(subject, planned_minutes, started_at) VALUES(?,?,?)",
+        ("Study", planned_minutes, utc_now_iso()),
+    )
+    sid = int(cur.lastrowid)
+    con.commit()
+    con.close()
+    return sid
+
+
+def _row(session_id: int):
+    con = connect()
+    row = con.execute(
+        "SELECT ended_at, distractions_count FROM sessions WHERE id = ?", (session_id,)
+    ).fetchone()
+    con.close()
+    return row
+
+
+def test_session_opened_by_another_process_accepts_writes(repo):
+    sid = _insert_session_elsewhere()
+
+    repo.add_distraction(sid, "phone")
+    repo.add_distraction(sid, None)
+    repo.end_session(sid, 600, 80, 1, "B")
+
+    row = _row(sid)
+    assert row["ended_at"] is not None
+    assert row["distractions_count"] == 2
+
+
+def test_end_session_rejects_unknown_and_ended(repo):
+    with pytest.raises(ValueError):
+        repo.end_session(10**9, 0, 100, 0, None)
+
+    sid = repo.create_session("Study", 50)
+    repo.end_session(sid, 60, 100, 0, "A")
+    with pytest.raises(ValueError):
+        repo.end_session(sid, 60, 100, 0, "A")
+    with pytest.raises(ValueError):
+        repo.add_distraction(sid, None)
+
+
+def test_reads_of_unknown_tenant_write_nothing(repo):
+    r = repo.for_tenant("never-started")
+    assert r.today_stats()["sessions"] == 0
+    assert r.recent_sessions() == []
+    assert r.history_page() == []
+    assert r.get_open_session(1) is None
+
+    con = connect()
+    row = con.execute("SELECT 1 FROM tenant_shards WHERE tenant = ?", ("never-started",)).fetchone()
+    con.close()
+    assert row is None
+
+
+def test_sweeper_closes_sessions_in_evicted_shards(repo):
+    r = repo.for_tenant("sweep-me")
+    sid = r.create_session("Study", 5)
+    shard = r.shard
+    assert shard.name != MAIN_SHARD
+
+    con = shard.connect()
+    con.execute("UPDATE sessions SET started_at = ? WHERE id = ?", ("2020-01-01T00:00:00+00:00", sid))
+    con.commit()
+    con.close()
+
+    # шард выгружен из роутера: его реестра в процессе больше нет
+    shard_router.forget()
+    repo.load_open_sessions()
+    assert shard.name not in {s.name for s in shard_router.resident()}
+
+    assert repo.close_abandoned(60) >= 1
+    con = connect(shard.path)
+    row = con.execute("SELECT ended_at FROM sessions WHERE id = ?", (sid,)).fetchone()
+    con.close()
+    assert row["ended_at"] is not None
+
+
+def test_registry_reload_keeps_last_activity(repo):
+    # старт давно, отвлечение только что: после перезагрузки реестра сессия не брошенная
+    sid = repo.create_session("Study", 5)
+    con = connect()
+    con.execute("UPDATE sessions SET started_at = ? WHERE id = ?", ("2020-01-01T00:00:00+00:00", sid))
+    con.commit()
+    con.close()
+    repo.add_distraction(sid, None)
+
+    shard = shard_router.shard(MAIN_SHARD)
+    shard.load_open_sessions()
+    assert sid not in {s.id for s in shard.open_sessions.abandoned(60)}
+    assert sid not in _abandoned_in_db(shard, 60)
+    repo.end_session(sid, 0, 100, 0, None)
+
+
+def test_other_worker_refreshes_only_changed_sessions(repo):
+    # второй воркер — отдельный Shard со своим реестром над тем же файлом
+    kept = repo.create_session("Study", 50)
+    ended = repo.create_session("Study", 50)
+    repo.ensure_checkpoints(kept, 50)
+    other = Shard(MAIN_SHARD)
+    other.load_open_sessions()
+
+    loads = []
+    load = other.open_sessions.load
+    other.open_sessions.load = lambda con, ids=None: (loads.append(ids), load(con, ids))
+
+    cp = repo.list_checkpoints(kept)[0]
+    repo.add_distraction(kept, None)
+    repo.complete_checkpoint(cp["id"], "done")
+    repo.end_session(ended, 60, 100, 0, "A")
+    other.sync()
+
+    assert loads and all(ids is not None for ids in loads)
+    assert {sid for ids in loads for sid in ids} == {kept, ended}
+    assert other.open_sessions.get(ended) is None
+    s = other.open_sessions.get(kept)
+    assert s.distractions_count == 1
+    assert s.checkpoints[cp["id"]]["completed_at"] is not None
+    assert other.open_sessions.version == other.version()
+
+    # без новых записей sync ничего не читает
+    loads.clear()
+    other.sync()
+    assert loads == []
+    other.close()
+    repo.end_session(kept, 60, 100, 0, "A")
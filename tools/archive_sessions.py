@@ -0,0 +1,41 @@
+"""Retention job: fold old sessions' events into summaries and move them to monthly archives.
+
+    FOCUSFLIGHT_DB_PATH=focusflight.db python -m tools.archive_sessions --older-than-days 90
+
+Safe to run next to a live server (short batches, busy retries, incremental vacuum).
+Databases created before incremental auto-vacuum cannot release pages that way: convert
+them once with --convert, a full VACUUM that blocks writers, so stop the server first.
+The same job without --convert is available as POST /api/admin/archive.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.core.config import settings  # noqa: E402
+from app.core.db import init_db  # noqa: E402
+from app.services.archive import run_archive  # noqa: E402
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--older-than-days", type=int, default=settings.archive_after_days,
+                    help="Archive sessions that ended more than this many days ago")
+    ap.add_argument("--no-vacuum", action="store_true", help="Skip incremental vacuum and WAL truncation")
+    ap.add_argument("--convert", action="store_true",
+                    help="Full VACUUM of files without incremental auto-vacuum (server stopped)")
+    args = ap.parse_args()
+
+    init_db()
+    for r in run_archive(args.older_than_days, vacuum=not args.no_vacuum, convert=args.convert):
+        months = ", ".join(r["months"]) or "-"
+        hint = " (run with --convert to release free pages)" if r["needs_convert"] else ""
+        print(f"{r['shard']}: {r['sessions']} sessions archived ({months}), "
+              f"{r['bytes_before']} -> {r['bytes_after']} bytes{hint}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
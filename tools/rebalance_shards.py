@@ -0,0 +1,142 @@
+"""Move tenants between session shards so placement matches --mode/--shards.
+
+    FOCUSFLIGHT_DB_PATH=focusflight.db python -m tools.rebalance_shards --mode hash --shards 8 --dry-run
+
+Run it with the server stopped. Tenants with open sessions are skipped (rerun later).
+Moved sessions get new ids in the target shard, so history cursors of a moved tenant
+restart from the first page. An interrupted run is safe to repeat: leftovers of a
+half-finished copy in the target shard are removed before copying again.
+Start the server with the same FOCUSFLIGHT_SHARD_MODE/COUNT afterwards so that new
+tenants are placed the same way.
+"""
+import argparse
+import sqlite3
+import sys
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.core.config import settings  # noqa: E402
+from app.core.db import DEFAULT_TENANT, connect, init_db  # noqa: E402
+from app.repositories.shards import Shard, placement, shard_path  # noqa: E402
+from app.services.archive import restore_tenant  # noqa: E402
+
+SESSION_COLS = (
+    "subject, planned_minutes, started_at, ended_at, actual_seconds, "
+    "distractions_count, altitude_end, turbulence_end, grade, tenant, "
+    "checkpoints_total, checkpoints_completed, distraction_histogram"
+)
+
+
+def _delete_tenant(cur: sqlite3.Cursor, schema: str, tenant: str) -> None:
+    owned = f"(SELECT id FROM {schema}.sessions WHERE tenant = ?)"
+    cur.execute(f"DELETE FROM {schema}.distractions WHERE session_id IN {owned}", (tenant,))
+    cur.execute(f"DELETE FROM {schema}.checkpoints WHERE session_id IN {owned}", (tenant,))
+    cur.execute(f"DELETE FROM {schema}.sessions WHERE tenant = ?", (tenant,))
+
+
+def move_tenant(tenant: str, src: str, dst: str) -> int | None:
+    """Copy one tenant's rows src -> dst, repoint the directory, delete from src. None = has open sessions."""
+    con = connect(shard_path(src))
+    has_open = con.execute(
+        "SELECT 1 FROM sessions WHERE tenant = ? AND ended_at IS NULL LIMIT 1", (tenant,)
+    ).fetchone()
+    con.close()
+    if has_open:
+        return None
+
+    # архивные строки привязаны к id исходного шарда: возвращаем их в горячие таблицы,
+    # на новом месте следующий прогон архивации сложит их заново
+    restore_tenant(Shard(src), tenant)
+
+    Shard(dst).init_schema()
+    con = connect(shard_path(dst))
+    con.execute("ATTACH DATABASE ? AS src", (shard_path(src),))
+    cur = con.cursor()
+
+    _delete_tenant(cur, "main", tenant)
+    cur.execute("CREATE TEMP TABLE id_map (old INTEGER PRIMARY KEY, new INTEGER NOT NULL)")
+    # по порядку id: внутри тенанта id по-прежнему растёт вместе со started_at
+    rows = cur.execute(
+        f"SELECT id, {SESSION_COLS} FROM src.sessions WHERE tenant = ? ORDER BY id", (tenant,)
+    ).fetchall()
+    for r in rows:
+        cur.execute(f"INSERT INTO main.sessions({SESSION_COLS}) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)", tuple(r)[1:])
+        cur.execute("INSERT INTO temp.id_map(old, new) VALUES (?, ?)", (r["id"], cur.lastrowid))
+    cur.execute("""
+        INSERT INTO main.distractions(session_id, noted_at, note)
+        SELECT m.new, d.noted_at, d.note
+        FROM src.distractions d JOIN temp.id_map m ON m.old = d.session_id
+        ORDER BY d.id
+    """)
+    cur.execute("""
+        INSERT INTO main.checkpoints(session_id, idx, due_seconds, created_at, completed_at, note)
+        SELECT m.new, c.idx, c.due_seconds, c.created_at, c.completed_at, c.note
+        FROM src.checkpoints c JOIN temp.id_map m ON m.old = c.session_id
+        ORDER BY c.id
+    """)
+    con.commit()
+
+    directory = connect()
+    directory.execute(
+        "INSERT INTO tenant_shards(tenant, shard) VALUES (?, ?) "
+        "ON CONFLICT(tenant) DO UPDATE SET shard = excluded.shard",
+        (tenant, dst)
+    )
+    directory.commit()
+    directory.close()
+
+    _delete_tenant(cur, "src", tenant)
+    con.commit()
+    con.close()
+    return len(rows)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mode", choices=["off", "hash", "tenant"], default=settings.shard_mode)
+    ap.add_argument("--shards", type=int, default=settings.shard_count, help="Shard count for --mode hash")
+    ap.add_argument("--dry-run", action="store_true", help="Only print the moves")
+    args = ap.parse_args()
+
+    init_db()
+    con = connect()
+    con.execute(
+        "INSERT OR IGNORE INTO tenant_shards(tenant, shard) VALUES (?, ?)",
+        (DEFAULT_TENANT, placement(DEFAULT_TENANT, args.mode, args.shards))
+    )
+    con.commit()
+    directory = {r["tenant"]: r["shard"] for r in con.execute("SELECT tenant, shard FROM tenant_shards")}
+    con.close()
+
+    moved = skipped = 0
+    final = Counter()
+    for tenant, current in sorted(directory.items()):
+        target = placement(tenant, args.mode, args.shards)
+        if target == current:
+            final[current] += 1
+            continue
+        if args.dry_run:
+            print(f"{tenant}: {current} -> {target}")
+            final[target] += 1
+            continue
+        n = move_tenant(tenant, current, target)
+        if n is None:
+            print(f"{tenant}: {current} -> {target} skipped (open sessions)")
+            skipped += 1
+            final[current] += 1
+            continue
+        print(f"{tenant}: {current} -> {target} ({n} sessions)")
+        moved += 1
+        final[target] += 1
+
+    for name, count in sorted(final.items()):
+        print(f"  {name}: {count} tenants")
+    print(f"Moved: {moved}, skipped: {skipped}{' (dry run)' if args.dry_run else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())